@@ -1,6 +1,26 @@
 # encoding=utf-8
-from .extensions import PublicAPI
-from .core import TumblrClient
+from importlib import import_module
 
-TumblrClient.register_extension(PublicAPI)
+__all__ = ['TumblrClient', 'SyncTumblrClient']
 
+# Loaded on first access (PEP 562), so `import aiotumblr` doesn't pull in aiohttp and oauthlib before they are needed
+_LAZY_ATTRIBUTES = {
+    'TumblrClient': '.core',
+    'SyncTumblrClient': '.sync',
+}
+_SUBMODULES = {'core', 'exceptions', 'extensions', 'sync', 'utils'}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY_ATTRIBUTES, *_SUBMODULES})
@@ -1,15 +1,37 @@
 # encoding=utf-8
 # Stubs for the aiotumblr.TumblrClient core class, with the idea that the public API is already hooked on it
-from typing import Dict, List, Tuple, Optional, Any, Union, Type
+from typing import Dict, List, Tuple, Optional, Any, Union, Type, AsyncIterator, Iterable, ContextManager, \
+    Awaitable, TypeVar
 
-from aiohttp import ClientResponse, ClientSession
+from aiohttp import ClientResponse, ClientSession, TraceConfig
 from oauthlib.oauth1 import Client
 
 from .extensions import Extension
+from .utils.signing import FastSigner
+from .utils.decoding import JSONLoads
+from .utils.ratelimit import RateLimiter, ConsumerKeyPool
+from .utils.retry import RetryPolicy
+from .utils.coalescing import RequestCoalescer
+from .utils.cache import ResponseCache, CachedResponse
+from .utils.bulk import BulkResult
+from .utils.scheduling import RequestScheduler
+from .utils.phases import PhaseTimer
+
+T = TypeVar('T')
 
 class TumblrClient:
     session: ClientSession
     oauth_client: Client
+    signer: Optional[FastSigner]
+    parse_responses: bool
+    json_loads: JSONLoads
+    rate_limiter: Optional[RateLimiter]
+    retry_policy: Optional[RetryPolicy]
+    coalescer: Optional[RequestCoalescer]
+    response_cache: Optional[ResponseCache]
+    scheduler: Optional[RequestScheduler]
+    consumer_key_pool: Optional[ConsumerKeyPool]
+    phase_timer: Optional[PhaseTimer]
     api_base_url: str
     request_token_url: str
     authorization_url: str
@@ -17,7 +39,24 @@ class TumblrClient:
 
     def __init__(self, consumer_key: str, consumer_secret: str, resource_owner_key: Optional[str] = None,
                  resource_owner_secret: Optional[str] = None, callback_uri: Optional[str] = None,
-                 oauth_verifier: Optional[str] = None, debug_mode: Optional[bool] = None): ...
+                 oauth_verifier: Optional[str] = None, debug_mode: Optional[bool] = None,
+                 connection_limit: int = 100, connection_limit_per_host: int = 0,
+                 keepalive_timeout: Optional[float] = 15.0, dns_cache_ttl: Optional[int] = 10,
+                 fast_signing: bool = False, parse_responses: bool = False,
+                 json_loads: Optional[JSONLoads] = None, rate_limiter: Optional[RateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None, coalesce_requests: bool = False,
+                 response_cache: Optional[ResponseCache] = None,
+                 scheduler: Optional[RequestScheduler] = None,
+                 session: Optional[ClientSession] = None,
+                 consumer_key_pool: Optional[ConsumerKeyPool] = None,
+                 trace_configs: Optional[List[TraceConfig]] = None,
+                 phase_timer: Optional[PhaseTimer] = None): ...
+
+    def for_user(self, resource_owner_key: str, resource_owner_secret: str) -> TumblrClient: ...
+
+    def enable_phase_timing(self, phase_timer: PhaseTimer) -> None: ...
+
+    def disable_phase_timing(self) -> None: ...
 
     async def fetch_request_token(self) -> Dict[str, str]: ...
 
@@ -29,7 +68,24 @@ class TumblrClient:
 
     async def signed_request(self, method: str, endpoint: str, params: Optional[List[Tuple[str, str]]] = None,
                              data: Optional[Dict[str, str]] = None, json: Optional[Any] = None,
-                             headers: Optional[Dict[str, str]] = None, **kwargs) -> ClientResponse: ...
+                             headers: Optional[Dict[str, str]] = None, cache_ttl: Optional[float] = None,
+                             priority: Optional[int] = None, **kwargs) -> Union[ClientResponse, CachedResponse]: ...
+
+    @staticmethod
+    def priority(priority: int) -> ContextManager[None]: ...
+
+    async def raw_call(self, method_name: str, *args, **kwargs) -> ClientResponse: ...
+
+    def stream_items(self, method_name: str, *args, items_key: str = 'posts', chunk_size: int = 16384,
+                     **kwargs) -> AsyncIterator[Any]: ...
+
+    def stream_response_items(self, resp: ClientResponse, items_key: str = 'posts',
+                              chunk_size: int = 16384) -> AsyncIterator[Any]: ...
+
+    def bulk(self, method_name: str, kwargs_iterable: Iterable[Dict[str, Any]], concurrency: int = 10,
+             ordered: bool = False) -> AsyncIterator[BulkResult]: ...
+
+    async def parse_response(self, resp: ClientResponse) -> Union[Dict[str, Any], List[Any], bytes]: ...
 
     @classmethod
     def register_extension(cls, extension: Type[Extension]): ...
@@ -46,37 +102,44 @@ class TumblrClient:
 
     async def get_blog_avatar_with_size(self, blog_identifier: str, size: Union[str, int]) -> ClientResponse: ...
 
-    async def get_blog_likes(self, blog_identifier: str, limit: Optional[int] = None, offset: Optional[int] = None,
+    async def get_blog_likes(self, blog_identifier: str, *, limit: Optional[int] = None, offset: Optional[int] = None,
                              before: Optional[int] = None, after: Optional[int] = None) \
             -> ClientResponse: ...
 
-    async def get_blog_following(self, blog_identifier: str, limit: Optional[int] = None,
+    async def get_blog_following(self, blog_identifier: str, *, limit: Optional[int] = None,
                                  offset: Optional[int] = None) \
             -> ClientResponse: ...
 
-    async def get_blog_followers(self, blog_identifier: str, limit: Optional[int] = None,
+    async def get_blog_followers(self, blog_identifier: str, *, limit: Optional[int] = None,
                                  offset: Optional[int] = None) \
             -> ClientResponse: ...
 
-    async def get_blog_posts(self, blog_identifier: str, type: Optional[str] = None, id: Optional[int] = None,
-                             tag: Optional[str] = None, limit: Optional[int] = None, offset: Optional[int] = None,
+    async def get_blog_posts(self, blog_identifier: str, *, id: Optional[int] = None, tag: Optional[str] = None,
+                             limit: Optional[int] = None, offset: Optional[int] = None,
                              reblog_info: Optional[bool] = None, notes_info: Optional[bool] = None,
-                             filter: Optional[str] = None, before: Optional[int] = None) \
+                             filter_: Optional[str] = None, before: Optional[int] = None) \
+            -> ClientResponse: ...
+
+    async def get_blog_posts_with_type(self, blog_identifier: str, type_: str, *, id: Optional[int] = None,
+                                       tag: Optional[str] = None, limit: Optional[int] = None,
+                                       offset: Optional[int] = None, reblog_info: Optional[bool] = None,
+                                       notes_info: Optional[bool] = None, filter_: Optional[str] = None,
+                                       before: Optional[int] = None) \
             -> ClientResponse: ...
 
-    async def get_blog_queue(self, blog_identifier: str, limit: Optional[int] = None, offset: Optional[int] = None,
-                             filter: Optional[str] = None) \
+    async def get_blog_queue(self, blog_identifier: str, *, limit: Optional[int] = None, offset: Optional[int] = None,
+                             filter_: Optional[str] = None) \
             -> ClientResponse: ...
 
-    async def get_blog_drafts(self, blog_identifier: str, before_id: Optional[int] = None,
-                              filter: Optional[str] = None) \
+    async def get_blog_drafts(self, blog_identifier: str, *, before_id: Optional[int] = None,
+                              filter_: Optional[str] = None) \
             -> ClientResponse: ...
 
-    async def get_blog_submission(self, blog_identifier: str, offset: Optional[int] = None,
-                                  filter: Optional[str] = None) \
+    async def get_blog_submissions(self, blog_identifier: str, *, offset: Optional[int] = None,
+                                   filter_: Optional[str] = None) \
             -> ClientResponse: ...
 
-    async def create_post(self, blog_identifier: str, content: List[Dict[str, Any]],
+    async def create_post(self, blog_identifier: str, content: List[Dict[str, Any]], *,
                           layout: Optional[List[Dict[str, Any]]] = None, state: Optional[str] = None,
                           publish_on: Optional[str] = None, tags: Optional[str] = None,
                           source_url: Optional[str] = None, send_to_twitter: Optional[bool] = None,
@@ -84,7 +147,7 @@ class TumblrClient:
             -> ClientResponse: ...
 
     async def reblog_post(self, blog_identifier: str, parent_tumblelog_uuid: str, parent_post_id: int, reblog_key: str,
-                          content: List[Dict[str, Any]], layout: Optional[List[Dict[str, Any]]] = None,
+                          content: List[Dict[str, Any]], *, layout: Optional[List[Dict[str, Any]]] = None,
                           state: Optional[str] = None, publish_on: Optional[str] = None, tags: Optional[str] = None,
                           source_url: Optional[str] = None, send_to_twitter: Optional[bool] = None,
                           send_to_facebook: Optional[bool] = None, hide_trail: Optional[bool] = None) \
@@ -92,20 +155,35 @@ class TumblrClient:
 
     async def fetch_post(self, blog_identifier: str, post_id: int) -> ClientResponse: ...
 
+    async def edit_post(self, blog_identifier: str, post_id: int, content: List[Dict[str, Any]], *,
+                        layout: Optional[List[Dict[str, Any]]] = None, state: Optional[str] = None,
+                        publish_on: Optional[str] = None, tags: Optional[str] = None, source_url: Optional[str] = None,
+                        send_to_twitter: Optional[bool] = None, send_to_facebook: Optional[bool] = None) \
+            -> ClientResponse: ...
+
+    async def edit_reblog(self, blog_identifier: str, post_id: int, parent_tumblelog_uuid: str, parent_post_id: int,
+                          reblog_key: str, content: List[Dict[str, Any]], *,
+                          layout: Optional[List[Dict[str, Any]]] = None, state: Optional[str] = None,
+                          publish_on: Optional[str] = None, tags: Optional[str] = None,
+                          source_url: Optional[str] = None, send_to_twitter: Optional[bool] = None,
+                          send_to_facebook: Optional[bool] = None, hide_trail: Optional[bool] = None) \
+            -> ClientResponse: ...
+
     async def delete_post(self, blog_identifier: str, id: int) -> ClientResponse: ...
 
     async def get_user_info(self) -> ClientResponse: ...
 
-    async def get_user_dashboard(self, limit: Optional[int] = None, offset: Optional[int] = None,
-                                 type: Optional[str] = None, since_id: Optional[int] = None,
+    async def get_user_dashboard(self, *, limit: Optional[int] = None, offset: Optional[int] = None,
+                                 type_: Optional[str] = None, since_id: Optional[int] = None,
                                  reblog_info: Optional[bool] = None, notes_info: Optional[bool] = None) \
             -> ClientResponse: ...
 
-    async def get_user_likes(self, limit: Optional[int] = None, offset: Optional[int] = None,
+    async def get_user_likes(self, *, limit: Optional[int] = None, offset: Optional[int] = None,
                              before: Optional[int] = None, after: Optional[int] = None) \
             -> ClientResponse: ...
 
-    async def get_user_following(self, limit: Optional[int] = None, offset: Optional[int] = None) -> ClientResponse: ...
+    async def get_user_following(self, *, limit: Optional[int] = None, offset: Optional[int] = None) \
+            -> ClientResponse: ...
 
     async def follow_blog(self, url: str) -> ClientResponse: ...
 
@@ -114,3 +192,69 @@ class TumblrClient:
     async def like_post(self, id: int, reblog_key: str) -> ClientResponse: ...
 
     async def unlike_post(self, id: int, reblog_key: str) -> ClientResponse: ...
+
+    # The following iterators are defined dynamically in aiotumblr.extensions.public, for endpoints with pagination
+    def iter_blog_likes(self, blog_identifier: str, *, prefetch: int = 2, limit: Optional[int] = None,
+                        offset: Optional[int] = None, before: Optional[int] = None, after: Optional[int] = None) \
+            -> AsyncIterator[Dict[str, Any]]: ...
+
+    def iter_blog_following(self, blog_identifier: str, *, prefetch: int = 2, limit: Optional[int] = None,
+                            offset: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]: ...
+
+    def iter_blog_followers(self, blog_identifier: str, *, prefetch: int = 2, limit: Optional[int] = None,
+                            offset: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]: ...
+
+    def iter_blog_posts(self, blog_identifier: str, *, prefetch: int = 2, id: Optional[int] = None,
+                        tag: Optional[str] = None, limit: Optional[int] = None, offset: Optional[int] = None,
+                        reblog_info: Optional[bool] = None, notes_info: Optional[bool] = None,
+                        filter_: Optional[str] = None, before: Optional[int] = None) \
+            -> AsyncIterator[Dict[str, Any]]: ...
+
+    def iter_blog_posts_with_type(self, blog_identifier: str, type_: str, *, prefetch: int = 2,
+                                  id: Optional[int] = None, tag: Optional[str] = None, limit: Optional[int] = None,
+                                  offset: Optional[int] = None, reblog_info: Optional[bool] = None,
+                                  notes_info: Optional[bool] = None, filter_: Optional[str] = None,
+                                  before: Optional[int] = None) \
+            -> AsyncIterator[Dict[str, Any]]: ...
+
+    def iter_blog_queue(self, blog_identifier: str, *, prefetch: int = 2, limit: Optional[int] = None,
+                        offset: Optional[int] = None, filter_: Optional[str] = None) \
+            -> AsyncIterator[Dict[str, Any]]: ...
+
+    def iter_blog_drafts(self, blog_identifier: str, *, prefetch: int = 2, before_id: Optional[int] = None,
+                         filter_: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]: ...
+
+    def iter_blog_submissions(self, blog_identifier: str, *, prefetch: int = 2, offset: Optional[int] = None,
+                              filter_: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]: ...
+
+    def iter_user_dashboard(self, *, prefetch: int = 2, limit: Optional[int] = None, offset: Optional[int] = None,
+                            type_: Optional[str] = None, since_id: Optional[int] = None,
+                            reblog_info: Optional[bool] = None, notes_info: Optional[bool] = None) \
+            -> AsyncIterator[Dict[str, Any]]: ...
+
+    def iter_user_likes(self, *, prefetch: int = 2, limit: Optional[int] = None, offset: Optional[int] = None,
+                        before: Optional[int] = None, after: Optional[int] = None) \
+            -> AsyncIterator[Dict[str, Any]]: ...
+
+    def iter_user_following(self, *, prefetch: int = 2, limit: Optional[int] = None,
+                            offset: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]: ...
+
+
+class SyncTumblrClient:
+    client: TumblrClient
+    timeout: Optional[float]
+
+    def __init__(self, *args, timeout: Optional[float] = None, **kwargs): ...
+
+    def run(self, awaitable: Awaitable[T]) -> T: ...
+
+    def for_user(self, resource_owner_key: str, resource_owner_secret: str) -> SyncTumblrClient: ...
+
+    def close(self) -> None: ...
+
+    def __enter__(self) -> SyncTumblrClient: ...
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None: ...
+
+    # Blocking counterparts of the methods of TumblrClient, e.g. `get_blog_info(blog_identifier) -> Dict[str, Any]`
+    def __getattr__(self, name: str) -> Any: ...
@@ -1,14 +1,32 @@
 # encoding=utf-8
-from typing import Dict, List, Tuple, Any, Optional, Type
-from urllib.parse import urlparse
+import asyncio
+import copy
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from contextvars import ContextVar
+from weakref import WeakKeyDictionary
+from typing import Dict, List, Tuple, Any, Optional, Type, Union, AsyncIterator, Iterable, Iterator
+from urllib.parse import urlparse, urlencode
 
 import aiohttp
 
 from oauthlib.oauth1 import Client
 from oauthlib.common import urldecode, add_params_to_uri
 
-from .extensions.base import Extension
-from aiotumblr.utils.tracers import AIOTumblrDebugger
+from .extensions import Extension, PublicAPI
+from .exceptions import error_for_status
+from aiotumblr.utils.signing import FastSigner
+from aiotumblr.utils.decoding import JSONLoads, default_json_loads
+from aiotumblr.utils.streaming import JSONItemScanner
+from aiotumblr.utils.ratelimit import RateLimiter, ConsumerKeyPool
+from aiotumblr.utils.retry import RetryPolicy
+from aiotumblr.utils.coalescing import RequestCoalescer
+from aiotumblr.utils.cache import ResponseCache, CacheEntry, CachedResponse
+from aiotumblr.utils.bulk import BulkResult, run_bulk
+from aiotumblr.utils.scheduling import RequestScheduler, request_priority
+from aiotumblr.utils.phases import PhaseTimer, current_method_name, signing_time
 
 import logging
 
@@ -16,6 +34,9 @@ __all__ = ['TumblrClient']
 
 log = logging.getLogger(__name__)
 
+# Set while calling endpoint methods that should hand back the response untouched, regardless of `parse_responses`
+_raw_responses = ContextVar('aiotumblr_raw_responses', default=False)
+
 
 class TumblrClient(object):
     api_base_url = 'https://api.tumblr.com/v2/'
@@ -23,13 +44,39 @@ class TumblrClient(object):
     authorization_url = 'https://www.tumblr.com/oauth/authorize'
     access_token_url = 'https://www.tumblr.com/oauth/access_token'
 
+    # Instrumented counterparts of the generated endpoint methods registered on this class, used by clients with a
+    # phase timer; built lazily. Subclasses get a dict of their own when an extension is registered on them.
+    _timed_methods = {}  # type: Dict[str, Any]
+
     def __init__(self, consumer_key: str, consumer_secret: str, resource_owner_key: Optional[str] = None,
                  resource_owner_secret: Optional[str] = None, callback_uri: Optional[str] = None,
-                 oauth_verifier: Optional[str] = None, debug_mode: Optional[bool] = None):
-        if debug_mode:
-            self.session = aiohttp.ClientSession(trace_configs=[AIOTumblrDebugger(logger=log)])
-        else:
-            self.session = aiohttp.ClientSession()
+                 oauth_verifier: Optional[str] = None, debug_mode: Optional[bool] = None,
+                 connection_limit: int = 100, connection_limit_per_host: int = 0,
+                 keepalive_timeout: Optional[float] = 15.0, dns_cache_ttl: Optional[int] = 10,
+                 fast_signing: bool = False, parse_responses: bool = False, json_loads: Optional[JSONLoads] = None,
+                 rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+                 coalesce_requests: bool = False, response_cache: Optional[ResponseCache] = None,
+                 scheduler: Optional[RequestScheduler] = None, session: Optional[aiohttp.ClientSession] = None,
+                 consumer_key_pool: Optional[ConsumerKeyPool] = None,
+                 trace_configs: Optional[List[aiohttp.TraceConfig]] = None,
+                 phase_timer: Optional[PhaseTimer] = None):
+        # The session (and its connector) is created lazily on first use, so it gets bound to the running loop
+        # instead of whichever loop happens to be current while constructing the client. A session passed in is
+        # shared with its owner, who is responsible for closing it.
+        self._session = session  # type: Optional[aiohttp.ClientSession]
+        self._session_loop = None  # type: Optional[asyncio.AbstractEventLoop]
+        self._owns_session = session is None
+        # Clients created with `for_user` use the session of the client they were created from
+        self._parent = None  # type: Optional[TumblrClient]
+        self._debug_mode = debug_mode
+        self._trace_configs = list(trace_configs or [])
+        self._connector_options = {
+            'limit': connection_limit,
+            'limit_per_host': connection_limit_per_host,
+            'keepalive_timeout': keepalive_timeout,
+            'use_dns_cache': dns_cache_ttl is not None,
+            'ttl_dns_cache': dns_cache_ttl,
+        }
 
         self.oauth_client = Client(
             client_key=consumer_key,
@@ -39,6 +86,130 @@ class TumblrClient(object):
             callback_uri=callback_uri,
             verifier=oauth_verifier,
         )
+        self.signer = FastSigner(self.oauth_client) if fast_signing else None
+
+        # When set, generated endpoint methods return the decoded `response` payload instead of the raw response
+        self.parse_responses = parse_responses
+        self.json_loads = json_loads or default_json_loads()
+
+        # Optional, may be shared between clients to enforce a common budget
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+
+        # Identical GET requests that are in flight at the same time share one upstream request, and the decoded
+        # payload when parsing responses
+        self.coalescer = RequestCoalescer() if coalesce_requests else None
+        self._decoded_responses = WeakKeyDictionary()  # type: WeakKeyDictionary
+
+        # GET endpoints declaring a `cache` TTL in their endpoint definition are answered from here when possible
+        self.response_cache = response_cache
+
+        # Optional concurrency budget shared between priority classes, may be shared between clients as well
+        self.scheduler = scheduler
+
+        # Requests without user credentials are spread over the consumer keys of this pool instead of using the
+        # consumer key of the client
+        self.consumer_key_pool = consumer_key_pool
+        self._pool_credentials = {}  # type: Dict[str, Tuple[Client, Optional[FastSigner]]]
+
+        self.phase_timer = None  # type: Optional[PhaseTimer]
+        if phase_timer is not None:
+            self.enable_phase_timing(phase_timer)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._parent is not None:
+            return self._parent.session
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if not self._owns_session:
+            session_loop = getattr(self._session, '_loop', None)
+            if loop is not None and session_loop is not None and session_loop is not loop:
+                raise RuntimeError('The session passed to this client belongs to another event loop; create the '
+                                   'session on the loop the client is used on.')
+            return self._session
+        if self._session is not None and not self._session.closed and loop is not None \
+                and self._session_loop is not loop:
+            # A session can't be used outside its loop, so it is closed there and replaced
+            log.debug('Event loop changed, replacing the session')
+            _close_session_elsewhere(self._session, self._session_loop)
+            self._session = None
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+            self._session_loop = loop
+        return self._session
+
+    def for_user(self, resource_owner_key: str, resource_owner_secret: str) -> 'TumblrClient':
+        """
+        Create a client making calls on behalf of another user, with the same consumer credentials and settings.
+
+        The new client shares the session and connection pool of this one, as well as its rate limiter, retry policy,
+        scheduler, coalescer and response cache, so it is cheap to create one per user (or even per request) and the
+        number of sockets depends on the concurrency instead of on the number of users. Closing the new client is a
+        no-op; the shared session is closed along with this client.
+
+        :param resource_owner_key: OAuth token of the user
+        :param resource_owner_secret: OAuth token secret of the user
+        :return: `TumblrClient` signing with the credentials of the user
+        """
+        client = copy.copy(self)
+        client._parent = self._parent or self
+        client._session = None
+        client._session_loop = None
+        client._owns_session = False
+        client.oauth_client = Client(
+            client_key=self.oauth_client.client_key,
+            client_secret=self.oauth_client.client_secret,
+            resource_owner_key=resource_owner_key,
+            resource_owner_secret=resource_owner_secret,
+        )
+        client.signer = FastSigner(client.oauth_client) if self.signer is not None else None
+        if self.phase_timer is not None:
+            # The instrumented methods copied along are bound to this client
+            client.enable_phase_timing(self.phase_timer)
+        return client
+
+    def enable_phase_timing(self, phase_timer: PhaseTimer):
+        """
+        Report the time spent in each phase of the endpoint methods of this client to `phase_timer`. Only affects
+        methods of extensions that were registered before.
+        """
+        self.phase_timer = phase_timer
+        for method_name, timed_method in self._timed_method_map().items():
+            # Plain functions or placeholders building the timed variant on first use
+            setattr(self, method_name, timed_method.__get__(self, type(self)))
+        self._sign = self._sign_timed
+
+    def disable_phase_timing(self):
+        for method_name in self._timed_method_map():
+            self.__dict__.pop(method_name, None)
+        self.__dict__.pop('_sign', None)
+        self.phase_timer = None
+
+    @classmethod
+    def _timed_method_map(cls) -> Dict[str, Any]:
+        # Timed variants of the methods as this class resolves them: from the class in the MRO defining each method
+        methods = {}  # type: Dict[str, Any]
+        defined = set()
+        for klass in cls.__mro__:
+            timed_methods = vars(klass).get('_timed_methods', {})
+            for name in vars(klass):
+                if name not in defined:
+                    defined.add(name)
+                    if name in timed_methods:
+                        methods[name] = timed_methods[name]
+        return methods
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(**self._connector_options)
+        trace_configs = list(self._trace_configs)
+        if self._debug_mode:
+            from aiotumblr.utils.tracers import AIOTumblrDebugger
+            trace_configs.append(AIOTumblrDebugger(logger=log))
+        log.debug(f'Creating session with connector options {self._connector_options}')
+        return aiohttp.ClientSession(connector=connector, trace_configs=trace_configs or None)
 
     async def fetch_request_token(self) -> Dict[str, str]:
         log.debug(f'Fetching request token...')
@@ -107,25 +278,268 @@ class TumblrClient(object):
 
     async def signed_request(self, method: str, endpoint: str, params: Optional[List[Tuple[str, str]]] = None,
                              data: Optional[Dict[str, str]] = None, json: Optional[Any] = None,
-                             headers: Optional[Dict[str, str]] = None, **kwargs) -> aiohttp.ClientResponse:
+                             headers: Optional[Dict[str, str]] = None, cache_ttl: Optional[float] = None,
+                             priority: Optional[int] = None, **kwargs) -> Union[aiohttp.ClientResponse, CachedResponse]:
+        if priority is not None:
+            with self.priority(priority):
+                return await self.signed_request(method, endpoint, params, data, json, headers, cache_ttl, **kwargs)
+
+        if method == 'GET' and not _raw_responses.get():
+            if cache_ttl and self.response_cache is not None:
+                return await self._cached_request(endpoint, params, headers, cache_ttl)
+            if self.coalescer is not None:
+                return await self._coalesced_request(endpoint, params, headers)
+
+        return await self._request(method, endpoint, params, data, json, headers)
+
+    async def _cached_request(self, endpoint: str, params: Optional[List[Tuple[str, str]]],
+                              headers: Optional[Dict[str, str]],
+                              cache_ttl: float) -> Union[aiohttp.ClientResponse, CachedResponse]:
+        key = f'{self.oauth_client.resource_owner_key or ""}:{endpoint}?{urlencode(params or [])}'
+        entry = await self.response_cache.get(key)
+
+        now = time.time()
+        if entry is not None and entry.is_fresh(now):
+            return CachedResponse(entry, url=self.api_base_url + endpoint)
+
+        request_headers = dict(headers) if headers else {}
+        if entry is not None:
+            # Stale, but the server can tell whether it changed
+            if entry.etag:
+                request_headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request_headers['If-Modified-Since'] = entry.last_modified
+
+        resp = await self._coalesced_request(endpoint, params, request_headers or None)
+
+        if resp.status == 304 and entry is not None:
+            resp.release()
+            entry.expires_at = time.time() + cache_ttl
+            await self.response_cache.set(key, entry)
+            return CachedResponse(entry, url=self.api_base_url + endpoint)
+
+        if resp.status == 200:
+            headers = {k: v for k, v in resp.headers.items() if k.lower() != 'set-cookie'}
+            entry = CacheEntry(resp.status, resp.reason or '', headers, await resp.read(), time.time() + cache_ttl)
+            await self.response_cache.set(key, entry)
+
+        return resp
+
+    async def _coalesced_request(self, endpoint: str, params: Optional[List[Tuple[str, str]]],
+                                 headers: Optional[Dict[str, str]]) -> aiohttp.ClientResponse:
+        if self.coalescer is None:
+            return await self._request_and_read('GET', endpoint, params, headers)
+
+        key = (
+            endpoint, tuple(params) if params else (), tuple(sorted(headers.items())) if headers else (),
+            self.oauth_client.client_key, self.oauth_client.resource_owner_key,
+        )
+        return await self.coalescer.run(key, lambda: self._request_and_read('GET', endpoint, params, headers))
+
+    async def _request_and_read(self, method: str, endpoint: str, params: Optional[List[Tuple[str, str]]],
+                                headers: Optional[Dict[str, str]]) -> aiohttp.ClientResponse:
+        resp = await self._request(method, endpoint, params, None, None, headers)
+        # Read the body so every waiter can decode the shared response
+        await resp.read()
+        return resp
+
+    async def _request(self, method: str, endpoint: str, params: Optional[List[Tuple[str, str]]],
+                       data: Optional[Dict[str, str]], json: Optional[Any],
+                       headers: Optional[Dict[str, str]]) -> aiohttp.ClientResponse:
+        policy = self.retry_policy
+        if policy is None or not policy.allows(method):
+            return await self._send(method, endpoint, params, data, json, headers)
+
+        attempt = 1
+        while True:
+            try:
+                resp = await self._send(method, endpoint, params, data, json, headers)
+            except Exception as e:
+                if attempt >= policy.max_attempts or not policy.should_retry_exception(e):
+                    raise
+                delay = policy.delay(attempt)
+                log.debug(f'{method} {endpoint} failed with {e!r}, retrying in {delay:.2f}s')
+            else:
+                if attempt >= policy.max_attempts or not policy.should_retry_status(resp.status):
+                    return resp
+                delay = policy.delay(attempt, resp.headers)
+                resp.release()
+                log.debug(f'{method} {endpoint} returned {resp.status}, retrying in {delay:.2f}s')
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send(self, method: str, endpoint: str, params: Optional[List[Tuple[str, str]]],
+                    data: Optional[Dict[str, str]], json: Optional[Any],
+                    headers: Optional[Dict[str, str]]) -> aiohttp.ClientResponse:
         url = self.api_base_url + endpoint
+        oauth_client, signer = self.oauth_client, self.signer
+        consumer_key, account_key = oauth_client.client_key, oauth_client.resource_owner_key
+
+        pool = self.consumer_key_pool if not account_key else None
+        if pool is not None:
+            consumer_key = await pool.acquire()
+            oauth_client, signer = self._pool_client(consumer_key)
 
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(consumer_key, account_key)
+
+        if self.scheduler is None:
+            resp = await self._send_signed(method, url, endpoint, params, data, json, headers, oauth_client, signer)
+        else:
+            async with self.scheduler.slot(request_priority.get()):
+                resp = await self._send_signed(method, url, endpoint, params, data, json, headers, oauth_client,
+                                               signer)
+
+        if pool is not None:
+            pool.update(consumer_key, resp.status, resp.headers)
+        if self.rate_limiter is not None:
+            self.rate_limiter.update(consumer_key, account_key, resp.status, resp.headers)
+
+        return resp
+
+    def _pool_client(self, consumer_key: str) -> Tuple[Client, Optional[FastSigner]]:
+        try:
+            return self._pool_credentials[consumer_key]
+        except KeyError:
+            oauth_client = Client(client_key=consumer_key,
+                                  client_secret=self.consumer_key_pool.secret(consumer_key))
+            signer = FastSigner(oauth_client) if self.signer is not None else None
+            credentials = self._pool_credentials[consumer_key] = (oauth_client, signer)
+            return credentials
+
+    async def _send_signed(self, method: str, url: str, endpoint: str, params: Optional[List[Tuple[str, str]]],
+                           data: Optional[Dict[str, str]], json: Optional[Any], headers: Optional[Dict[str, str]],
+                           oauth_client: Client, signer: Optional[FastSigner]) -> aiohttp.ClientResponse:
+        # Available to trace configs as `trace_config_ctx.trace_request_ctx`
+        trace_request_ctx = SimpleNamespace(method_name=current_method_name.get())
         if data:
-            _, signed_headers, _ = self.oauth_client.sign(
-                add_params_to_uri(url, params), http_method=method, body=data, headers=headers
-            )
-            return await self.session.request(method, url, params=params, data=data, headers=signed_headers)
+            signed_headers = self._sign(method, endpoint, params, data, headers, oauth_client, signer)
+            return await self.session.request(method, url, params=params, data=data, headers=signed_headers,
+                                              trace_request_ctx=trace_request_ctx)
         elif json:
             # Since it is JSON, body apparently doesn't matter when signing
-            _, signed_headers, _ = self.oauth_client.sign(
-                add_params_to_uri(url, params), http_method=method, headers=headers
-            )
-            return await self.session.request(method, url, params=params, json=json, headers=signed_headers)
+            signed_headers = self._sign(method, endpoint, params, None, headers, oauth_client, signer)
+            return await self.session.request(method, url, params=params, json=json, headers=signed_headers,
+                                              trace_request_ctx=trace_request_ctx)
         else:
-            _, signed_headers, _ = self.oauth_client.sign(
-                add_params_to_uri(url, params), http_method=method, headers=headers
-            )
-            return await self.session.request(method, url, params=params, headers=signed_headers)
+            signed_headers = self._sign(method, endpoint, params, None, headers, oauth_client, signer)
+            return await self.session.request(method, url, params=params, headers=signed_headers,
+                                              trace_request_ctx=trace_request_ctx)
+
+    def _sign(self, method: str, endpoint: str, params: Optional[List[Tuple[str, str]]],
+              data: Optional[Dict[str, str]], headers: Optional[Dict[str, str]], oauth_client: Client,
+              signer: Optional[FastSigner]) -> Dict[str, str]:
+        if signer is not None:
+            return signer.sign(method, self.api_base_url, endpoint, params=params, body=data, headers=headers)
+
+        _, signed_headers, _ = oauth_client.sign(
+            add_params_to_uri(self.api_base_url + endpoint, params), http_method=method, body=data, headers=headers
+        )
+        return signed_headers
+
+    @staticmethod
+    @contextmanager
+    def priority(priority: int) -> Iterator[None]:
+        """
+        Run the requests made inside the `with` block, including those of tasks started from it, with `priority` when
+        going through a `RequestScheduler`; e.g. `PRIORITY_LOW` for a background crawl.
+        """
+        token = request_priority.set(priority)
+        try:
+            yield
+        finally:
+            request_priority.reset(token)
+
+    def _sign_timed(self, *args) -> Dict[str, str]:
+        started = self.phase_timer.clock()
+        try:
+            return type(self)._sign(self, *args)
+        finally:
+            signing = signing_time.get()
+            if signing is not None:
+                signing[0] += self.phase_timer.clock() - started
+
+    def _wants_parsed_response(self) -> bool:
+        return self.parse_responses and not _raw_responses.get()
+
+    async def raw_call(self, method_name: str, *args, **kwargs) -> aiohttp.ClientResponse:
+        """Call the registered endpoint method `method_name`, always returning the unread `aiohttp.ClientResponse`."""
+        token = _raw_responses.set(True)
+        try:
+            return await getattr(self, method_name)(*args, **kwargs)
+        finally:
+            _raw_responses.reset(token)
+
+    async def stream_items(self, method_name: str, *args, items_key: str = 'posts', chunk_size: int = 16384,
+                           **kwargs) -> AsyncIterator[Any]:
+        """
+        Call the registered endpoint method `method_name` and yield the entries of `response[items_key]` one by one,
+        decoding each as soon as it has been received instead of buffering the whole page first.
+        """
+        resp = await self.raw_call(method_name, *args, **kwargs)
+        async for item in self.stream_response_items(resp, items_key=items_key, chunk_size=chunk_size):
+            yield item
+
+    async def stream_response_items(self, resp: aiohttp.ClientResponse, items_key: str = 'posts',
+                                    chunk_size: int = 16384) -> AsyncIterator[Any]:
+        if resp.status >= 400 or resp.content_type != 'application/json':
+            # Errors are small and non-JSON bodies have no items; let `parse_response` raise or hand the body back
+            await self.parse_response(resp)
+            return
+
+        scanner = JSONItemScanner(items_path=('response', items_key), value_paths=[('meta',)])
+        async with resp:
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                for kind, raw in scanner.feed(chunk):
+                    if kind == 'item':
+                        yield self.json_loads(raw)
+                    else:
+                        meta = self.json_loads(raw) or {}
+                        status = meta.get('status', resp.status)
+                        if not 200 <= status < 300:
+                            raise error_for_status(status)(status, meta.get('msg', resp.reason or ''), response=resp)
+
+    def bulk(self, method_name: str, kwargs_iterable: Iterable[Dict[str, Any]], concurrency: int = 10,
+             ordered: bool = False) -> AsyncIterator[BulkResult]:
+        """
+        Call the registered endpoint method `method_name` for every set of keyword arguments in `kwargs_iterable`,
+        with at most `concurrency` calls in flight. Yields a `BulkResult` per call, in completion order or, with
+        `ordered`, in input order; failing calls are reported in their result instead of stopping the batch.
+        """
+        return run_bulk(self, method_name, kwargs_iterable, concurrency=concurrency, ordered=ordered)
+
+    async def parse_response(self, resp: aiohttp.ClientResponse) -> Union[Dict[str, Any], List[Any], bytes]:
+        if self.coalescer is None:
+            return await self._parse_response(resp)
+
+        # Responses may be shared by coalesced requests, decode them only once
+        try:
+            return self._decoded_responses[resp]
+        except KeyError:
+            decoded = self._decoded_responses[resp] = await self._parse_response(resp)
+            return decoded
+
+    async def _parse_response(self, resp: aiohttp.ClientResponse) -> Union[Dict[str, Any], List[Any], bytes]:
+        body = await resp.read()
+
+        if resp.content_type != 'application/json':
+            # E.g. the avatar endpoints, which redirect to the image itself
+            if resp.status >= 400:
+                raise error_for_status(resp.status)(resp.status, resp.reason or '', response=resp)
+            return body
+
+        data = self.json_loads(body)
+        if not isinstance(data, dict):
+            return data
+
+        meta = data.get('meta') or {}
+        status = meta.get('status', resp.status)
+        if not 200 <= status < 300:
+            raise error_for_status(status)(status, meta.get('msg', resp.reason or ''), errors=data.get('errors'),
+                                           response=resp)
+
+        return data.get('response')
 
     @classmethod
     def register_extension(cls, extension: Type[Extension]):
@@ -136,4 +550,59 @@ class TumblrClient(object):
         extension.unregister(cls)
 
     async def close_connection(self):
-        await self.session.close()
+        if self._owns_session and self._session is not None:
+            if self._session_loop is asyncio.get_running_loop():
+                await self._session.close()
+            else:
+                _close_session_elsewhere(self._session, self._session_loop)
+            self._session = None
+
+
+def _close_session_elsewhere(session: aiohttp.ClientSession, loop: Optional[asyncio.AbstractEventLoop]):
+    """Close `session`, created on `loop`, from outside that loop."""
+    if session.closed:
+        return
+    if loop is not None and loop.is_running():
+        # Running in another thread
+        asyncio.run_coroutine_threadsafe(session.close(), loop)
+        return
+    if loop is not None and not loop.is_closed():
+        # Idle, e.g. between `run_until_complete` calls; it can run the close in a thread of its own, since this one
+        # is running another loop
+        thread = threading.Thread(target=loop.run_until_complete, args=(session.close(),))
+        thread.start()
+        thread.join()
+        return
+
+    # The loop is closed, typically by `asyncio.run`, so nothing can be scheduled on it anymore: the sockets of the
+    # connections are closed directly, which relies on internals of aiohttp and asyncio
+    connector = session.connector
+    session.detach()
+    if connector is None:
+        return
+    try:
+        protocols = [protocol for connections in connector._conns.values() for protocol, _ in connections]
+        protocols.extend(connector._acquired)
+        connector._conns.clear()
+        connector._acquired.clear()
+        connector._closed = True
+    except AttributeError:
+        log.warning('Could not close the connections of a session left behind on a closed event loop')
+        return
+    for protocol in protocols:
+        transport = protocol.transport
+        if transport is None:
+            continue
+        try:
+            transport.abort()
+        except RuntimeError:
+            # Raised when scheduling the callback that would close the socket, on the closed loop
+            pass
+        sock = getattr(transport, '_sock', None)
+        if sock is not None:
+            sock.close()
+            transport._sock = None
+
+
+# Registered here rather than in the package, so importing `aiotumblr.core` alone gives a complete client
+TumblrClient.register_extension(PublicAPI)
@@ -0,0 +1,58 @@
+# encoding=utf-8
+from typing import Any, Dict, List, Optional, Type
+
+__all__ = ['TumblrError', 'TumblrAPIError', 'TumblrBadRequest', 'TumblrUnauthorized', 'TumblrForbidden',
+           'TumblrNotFound', 'TumblrRateLimited', 'TumblrServerError', 'error_for_status']
+
+
+class TumblrError(Exception):
+    pass
+
+
+class TumblrAPIError(TumblrError):
+    """Raised when the API answers with a non-2xx status, either in `meta.status` or as the HTTP status."""
+    def __init__(self, status: int, msg: str, errors: Optional[List[Dict[str, Any]]] = None, response: Any = None):
+        super().__init__(f'{status} {msg}')
+        self.status = status
+        self.msg = msg
+        self.errors = errors or []
+        self.response = response
+
+
+class TumblrBadRequest(TumblrAPIError):
+    pass
+
+
+class TumblrUnauthorized(TumblrAPIError):
+    pass
+
+
+class TumblrForbidden(TumblrAPIError):
+    pass
+
+
+class TumblrNotFound(TumblrAPIError):
+    pass
+
+
+class TumblrRateLimited(TumblrAPIError):
+    pass
+
+
+class TumblrServerError(TumblrAPIError):
+    pass
+
+
+_ERRORS_BY_STATUS = {
+    400: TumblrBadRequest,
+    401: TumblrUnauthorized,
+    403: TumblrForbidden,
+    404: TumblrNotFound,
+    429: TumblrRateLimited,
+}
+
+
+def error_for_status(status: int) -> Type[TumblrAPIError]:
+    if status >= 500:
+        return TumblrServerError
+    return _ERRORS_BY_STATUS.get(status, TumblrAPIError)
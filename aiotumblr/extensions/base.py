@@ -1,6 +1,5 @@
 # encoding=utf-8
 from typing import Callable
-from forge import repr_callable
 
 from aiotumblr.extensions.utils import parse_method_info, generate_docstring, format_docstring_for_sphinx
 
@@ -40,6 +39,16 @@ __all__ = ['POST_TYPES', 'NPF_POST_STATES', 'Extension']
 #         },
 #     },
 #     'body_type': 'kv',  # 'kv', 'json' or None
+#     'cache': {  # optional, GET only; used when the client has a `response_cache`
+#         'ttl': 300,  # seconds a response is served from the cache before being revalidated
+#     },
+#     'pagination': {  # optional, GET only; generates an `iter_*` async iterator next to the method
+#         'items': 'posts',  # key in the response holding the items of a page
+#         'offset': 'offset',  # offset parameter, or None if the endpoint only pages with a cursor
+#         'max_offset': 1000,  # optional; highest offset (exclusive) the API accepts
+#         'cursor': 'before',  # optional; parameter to page with once the offset runs out
+#         'cursor_field': 'timestamp',  # item key holding the value for `cursor`
+#     },
 # }
 
 # Constants for both APIs:
@@ -87,6 +96,9 @@ class Extension(object):
 
     @classmethod
     def _generate_doc_from_method(cls, method: Callable):
+        # Only used when building documentation, so forge isn't loaded with the library
+        from forge import repr_callable
+
         doc = f".. py:method:: {repr_callable(method)}\n\n"
         doc += format_docstring_for_sphinx(method.__doc__, indent=3)
         return doc
@@ -1,6 +1,6 @@
 # encoding=utf-8
 from .base import Extension, POST_TYPES, NPF_POST_STATES
-from .utils import create_method, parse_method_info
+from .utils import register_endpoint, unregister_endpoint
 from ._validators import validate_blog_identifier
 
 METHOD_PREFIX = 'public'
@@ -23,6 +23,9 @@ _ENDPOINTS = [
         'content_type': None,  # options: None/'application/x-www-form-urlencoded'/'application/json'
         'body': None,  # options: None/dict
         'body_type': None,  # options: None/'json'/'kv'
+        'cache': {
+            'ttl': 300,
+        },
     },
     {
         'method_name': 'get_blog_avatar',
@@ -41,6 +44,9 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'cache': {
+            'ttl': 3600,
+        },
     },
     {
         'method_name': 'get_blog_avatar_with_size',
@@ -64,6 +70,9 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'cache': {
+            'ttl': 3600,
+        },
     },
     {
         'method_name': 'get_blog_likes',
@@ -111,6 +120,13 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'pagination': {
+            'items': 'liked_posts',
+            'offset': 'offset',
+            'max_offset': 1000,
+            'cursor': 'before',
+            'cursor_field': 'liked_timestamp',
+        },
     },
     {
         'method_name': 'get_blog_following',
@@ -144,6 +160,13 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'cache': {
+            'ttl': 300,
+        },
+        'pagination': {
+            'items': 'blogs',
+            'offset': 'offset',
+        },
     },
     {
         'method_name': 'get_blog_followers',
@@ -176,6 +199,10 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'pagination': {
+            'items': 'users',
+            'offset': 'offset',
+        },
     },
     {
         'method_name': 'get_blog_posts',
@@ -254,6 +281,13 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'pagination': {
+            'items': 'posts',
+            'offset': 'offset',
+            'max_offset': 1000,
+            'cursor': 'before',
+            'cursor_field': 'timestamp',
+        },
     },
     {
         'method_name': 'get_blog_posts_with_type',
@@ -340,6 +374,13 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'pagination': {
+            'items': 'posts',
+            'offset': 'offset',
+            'max_offset': 1000,
+            'cursor': 'before',
+            'cursor_field': 'timestamp',
+        },
     },
     {
         'method_name': 'get_blog_queue',
@@ -384,6 +425,10 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'pagination': {
+            'items': 'posts',
+            'offset': 'offset',
+        },
     },
     {
         'method_name': 'get_blog_drafts',
@@ -422,6 +467,11 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'pagination': {
+            'items': 'posts',
+            'cursor': 'before_id',
+            'cursor_field': 'id',
+        },
     },
     {
         'method_name': 'get_blog_submissions',
@@ -458,6 +508,10 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'pagination': {
+            'items': 'posts',
+            'offset': 'offset',
+        },
     },
     # TODO: support uploading media
     {
@@ -656,6 +710,9 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'cache': {
+            'ttl': 60,
+        },
     },
     {
         'method_name': 'edit_post',
@@ -942,6 +999,11 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'pagination': {
+            'items': 'posts',
+            'offset': 'offset',
+            'max_offset': 1000,
+        },
     },
     {
         'method_name': 'get_user_likes',
@@ -986,6 +1048,13 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'pagination': {
+            'items': 'liked_posts',
+            'offset': 'offset',
+            'max_offset': 1000,
+            'cursor': 'before',
+            'cursor_field': 'liked_timestamp',
+        },
     },
     {
         'method_name': 'get_user_following',
@@ -1013,6 +1082,10 @@ _ENDPOINTS = [
         'content_type': None,
         'body': None,
         'body_type': None,
+        'pagination': {
+            'items': 'blogs',
+            'offset': 'offset',
+        },
     },
     {
         'method_name': 'follow_blog',
@@ -1107,13 +1180,12 @@ class PublicAPI(Extension):
     @classmethod
     def register(cls, client):
         for method_info in _ENDPOINTS:
-            params, body = parse_method_info(method_info)
-            create_method(client, params, body, method_info)
+            register_endpoint(client, method_info)
 
     @classmethod
     def unregister(cls, client):
         for method_info in _ENDPOINTS:
-            delattr(client, method_info['method_name'])
+            unregister_endpoint(client, method_info)
 
     @classmethod
     def generate_docs(cls):
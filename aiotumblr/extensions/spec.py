@@ -0,0 +1,167 @@
+# encoding=utf-8
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+__all__ = ['URL', 'QUERY', 'BODY', 'ArgumentSpec', 'EndpointSpec', 'format_parameter_value']
+
+# Where the value of an argument is sent
+URL = 'url'
+QUERY = 'query'
+BODY = 'body'
+
+_PLACEHOLDER = re.compile(r'{(\w+)}')
+
+
+def format_parameter_value(param):
+    if isinstance(param, bool):
+        return str(param).lower()
+    return param
+
+
+def sphinx_format_parameter(param):
+    """Fix for Sphinx #519"""
+    if param.endswith('_'):
+        return f'{param[:-1]}\\_'
+    else:
+        return param
+
+
+class ArgumentSpec(object):
+    """
+    One argument of an endpoint method: a URL parameter, query parameter or body key.
+
+    :param name: Name of the argument of the method
+    :param wire_name: Name the API knows it by, i.e. `_internal_name` in the endpoint structure
+    :param location: Where the value is sent: `URL`, `QUERY` or `BODY`
+    :param info: Entry of the argument in the endpoint structure
+    :param required: Whether the argument has to be passed
+    :param formatter: Converts values before sending, None to send them as they are (e.g. in JSON bodies)
+    """
+    __slots__ = ('name', 'wire_name', 'location', 'type', 'description', 'required', 'validator', 'formatter')
+
+    def __init__(self, name: str, wire_name: str, location: str, info: Dict[str, Any], required: bool,
+                 formatter: Optional[Callable[[Any], Any]]):
+        self.name = name
+        self.wire_name = wire_name
+        self.location = location
+        self.type = info['type']  # type: type
+        self.description = info['description']  # type: str
+        self.required = required
+        self.validator = info.get('validator')  # type: Optional[Callable[[Any], bool]]
+        self.formatter = formatter
+
+    def docstring(self) -> str:
+        name = sphinx_format_parameter(self.name)
+        optional = '' if self.required else ' or None'
+        return f":param {name}: {self.description}\n:type {name}: {self.type.__name__}{optional}"
+
+    def __repr__(self):
+        return f'<ArgumentSpec {self.name!r} {self.location}:{self.wire_name!r}>'
+
+
+class EndpointSpec(object):
+    """
+    Compiled form of an endpoint structure (see `aiotumblr.extensions.base`), with the arguments sorted out once:
+    which are required and which optional, the names they are sent by, where they go and how values are formatted.
+    Generating the endpoint method, its docstring and anything else derived from an endpoint starts from here.
+
+    :param method_info: Endpoint structure
+    :param params: Query parameters split into required and optional, as by `parse_method_info`; split here if omitted
+    :param body: Body keys split into required and optional, as by `parse_method_info`; split here if omitted
+    """
+    __slots__ = ('method_name', 'summary', 'description', 'http_method', 'endpoint', 'endpoint_parts',
+                 'url_parameters', 'required_params', 'optional_params', 'required_body', 'optional_body',
+                 'content_type', 'body_type', 'cache_ttl', 'pagination')
+
+    def __init__(self, method_info: Dict[str, Any], params: Optional[Dict[str, Any]] = None,
+                 body: Optional[Dict[str, Any]] = None):
+        self.method_name = method_info['method_name']  # type: str
+        self.summary = method_info['description_summary']  # type: str
+        self.description = method_info['description_long']  # type: Optional[str]
+        self.http_method = method_info['http_method']  # type: str
+        self.endpoint = method_info['endpoint']  # type: str
+        self.content_type = method_info['content_type']  # type: Optional[str]
+        self.body_type = method_info['body_type']  # type: Optional[str]
+        self.cache_ttl = method_info['cache']['ttl'] if method_info.get('cache') else None  # type: Optional[float]
+        self.pagination = method_info.get('pagination')  # type: Optional[Dict[str, Any]]
+
+        placeholders = set(_PLACEHOLDER.findall(self.endpoint))
+        self.url_parameters = tuple(
+            ArgumentSpec(name, name, URL, info, True, None) for name, info in method_info['url_parameters'].items()
+        )  # type: Tuple[ArgumentSpec, ...]
+
+        def arguments(data: Optional[Dict[str, Any]], names: Optional[List[str]], required: bool, location: str,
+                      formatter: Optional[Callable[[Any], Any]]) -> Tuple[ArgumentSpec, ...]:
+            if not data:
+                return ()
+            if names is None:
+                names = [name for name, info in data.items() if info['required'] == required]
+            specs = []
+            for name in names:
+                info = data[name]
+                wire_name = info.get('_internal_name', name)
+                # Parameters can end up in the URL under their internal name, e.g. `type_` in `posts/{type}`
+                specs.append(ArgumentSpec(name, wire_name, URL if wire_name in placeholders else location, info,
+                                          required, formatter))
+            return tuple(specs)
+
+        params = params or {}
+        body = body or {}
+        self.required_params = arguments(method_info['params'], params.get('required'), True, QUERY,
+                                          format_parameter_value)  # type: Tuple[ArgumentSpec, ...]
+        self.optional_params = arguments(method_info['params'], params.get('optional'), False, QUERY,
+                                          format_parameter_value)  # type: Tuple[ArgumentSpec, ...]
+        body_formatter = None if self.body_type == 'json' else format_parameter_value
+        self.required_body = arguments(method_info['body'], body.get('required'), True, BODY,
+                                        body_formatter)  # type: Tuple[ArgumentSpec, ...]
+        self.optional_body = arguments(method_info['body'], body.get('optional'), False, BODY,
+                                        body_formatter)  # type: Tuple[ArgumentSpec, ...]
+
+        url_arguments = {argument.wire_name: argument for argument in self.url_parameters}
+        for argument in (*self.required_params, *self.optional_params):
+            if argument.location == URL:
+                url_arguments.setdefault(argument.wire_name, argument)
+        parts = []  # type: List[Union[str, ArgumentSpec]]
+        for i, part in enumerate(_PLACEHOLDER.split(self.endpoint)):
+            # Odd parts are placeholders, even parts static text
+            if i % 2 == 0:
+                if part:
+                    parts.append(part)
+            elif part in url_arguments:
+                parts.append(url_arguments[part])
+            else:
+                raise ValueError(f'No argument for {{{part}}} in the endpoint of {self.method_name!r}.')
+        self.endpoint_parts = tuple(parts)  # type: Tuple[Union[str, ArgumentSpec], ...]
+
+    @property
+    def positional_arguments(self) -> Tuple[ArgumentSpec, ...]:
+        """Arguments of the method that can be passed by position, in order."""
+        return (*self.url_parameters, *self.required_params, *self.required_body)
+
+    @property
+    def keyword_arguments(self) -> Tuple[ArgumentSpec, ...]:
+        """Keyword-only arguments of the method, all optional."""
+        return (*self.optional_params, *self.optional_body)
+
+    def docstring(self) -> str:
+        ds = f"""{self.summary}\n"""
+
+        if self.description:
+            ds += f"""\n{self.description}\n"""
+
+        for arguments in (self.url_parameters, self.required_params, self.optional_params, self.required_body,
+                          self.optional_body):
+            if arguments:
+                ds += '\n' + '\n'.join(argument.docstring() for argument in arguments)
+
+        ds += f"""\n:return: API response for {self.method_name}, or its decoded `response` payload when the client \
+was created with `parse_responses=True`
+:rtype: `aiohttp.ClientResponse` or `dict`
+:raises aiotumblr.exceptions.TumblrAPIError: if the client parses responses and the API returns an error status
+:raises TypeError: if required parameter is missing
+:raises ValueError: if supplied parameter fails validation
+"""
+        return ds
+
+    def __repr__(self):
+        return f'<EndpointSpec {self.method_name!r} {self.http_method} {self.endpoint!r}>'
@@ -1,7 +1,11 @@
 # encoding=utf-8
-from typing import Dict, Any, Tuple, Union
+import asyncio
+import functools
+import linecache
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
 
-import forge
+from aiotumblr.extensions.spec import URL, EndpointSpec, format_parameter_value, sphinx_format_parameter
+from aiotumblr.utils.phases import call_started as _call_started, current_method_name, signing_time as _signing_time
 
 
 def format_docstring_for_sphinx(docstring: str, indent: int = 3) -> str:
@@ -12,20 +16,6 @@ def format_docstring_for_sphinx(docstring: str, indent: int = 3) -> str:
     return '\n'.join(lines_new)
 
 
-def format_parameter_value(param):
-    if isinstance(param, bool):
-        return str(param).lower()
-    return param
-
-
-def sphinx_format_parameter(param):
-    """Fix for Sphinx #519"""
-    if param.endswith('_'):
-        return f'{param[:-1]}\\_'
-    else:
-        return param
-
-
 def parse_method_info(method_info: Dict[str, Any]) -> Tuple[Dict[str, Union[list, Any]], Dict[str, Union[list, Any]]]:
     _params = method_info['params']
     _required_params = []
@@ -62,229 +52,397 @@ def parse_method_info(method_info: Dict[str, Any]) -> Tuple[Dict[str, Union[list
 
 
 def generate_docstring(params, body, method_info) -> str:
-    ds_url_params = '\n'.join(
-        f""":param {sphinx_format_parameter(key)}: {url_param['description']}
-:type {sphinx_format_parameter(key)}: {url_param['type'].__name__}"""
-        for key, url_param in method_info['url_parameters'].items()
+    return EndpointSpec(method_info, params, body).docstring()
+
+
+class _SourceWriter(object):
+    """Lines of generated source code, indented with four spaces per level."""
+    def __init__(self):
+        self.lines = []  # type: List[str]
+        self.level = 0
+
+    def line(self, code: str = ''):
+        self.lines.append(f"{'    ' * self.level}{code}" if code else '')
+
+    def indent(self):
+        self.level += 1
+
+    def dedent(self):
+        self.level -= 1
+
+    @property
+    def source(self) -> str:
+        return '\n'.join(self.lines) + '\n'
+
+
+def _generate_method_source(spec: EndpointSpec, timed: bool = False) -> Tuple[str, Dict[str, Any]]:
+    """
+    Source of a function implementing the endpoint of `spec`, and the globals it refers to.
+
+    Everything that can be decided from the endpoint structure is decided here instead of on every call: the signature,
+    which arguments are validated, the names they are sent by, how values are formatted and how the body is sent. The
+    timed variant reports the time spent in each phase to the phase timer of the client, see `PhaseTimer`.
+    """
+    method_name = spec.method_name
+    http_method = spec.http_method
+    namespace = {
+        '__name__': __name__,
+        '_format': format,
+        '_current_method_name': current_method_name,
+        '_call_started': _call_started,
+        '_signing_time': _signing_time,
+    }  # type: Dict[str, Any]
+    references = {}  # type: Dict[int, str]
+
+    def reference(value: Any) -> str:
+        try:
+            return references[id(value)]
+        except KeyError:
+            name = references[id(value)] = f'_ref{len(references)}'
+            namespace[name] = value
+            return name
+
+    signature = ['self']
+    for argument in spec.positional_arguments:
+        signature.append(f'{argument.name}: {reference(argument.type)}')
+    if spec.keyword_arguments:
+        signature.append('*')
+    for argument in spec.keyword_arguments:
+        signature.append(f'{argument.name}: {reference(argument.type)} = None')
+
+    w = _SourceWriter()
+    w.line(f"async def {method_name}({', '.join(signature)}):")
+    w.indent()
+    if timed:
+        w.line('_timer = self.phase_timer')
+        w.line('_clock = _timer.clock')
+        w.line('_started = _clock()')
+        w.line(f"_timer.record({method_name!r}, 'bind', _started - _call_started.get(_started))")
+        w.line('_validation = 0.0')
+
+    def validate(argument):
+        if argument.validator is None:
+            return
+        if timed:
+            w.line('_validation_started = _clock()')
+        w.line(f'if not {reference(argument.validator)}({argument.name}):')
+        w.indent()
+        w.line(f'raise ValueError({f"Supplied argument {argument.name!r} failed to validate"!r})')
+        w.dedent()
+        if timed:
+            w.line('_validation += _clock() - _validation_started')
+
+    def value(argument) -> str:
+        if argument.formatter is None:
+            return argument.name
+        return f'{reference(argument.formatter)}({argument.name})'
+
+    for argument in spec.url_parameters:
+        validate(argument)
+    # `str.format` formats values with `format(value, '')`
+    endpoint = ' + '.join(
+        repr(part) if isinstance(part, str) else f'_format({part.name})' for part in spec.endpoint_parts
     )
+    w.line(f'_endpoint = {endpoint or repr("")}')
+
+    w.line('_params = []')
+    for argument in (*spec.required_params, *spec.optional_params):
+        if argument.location == URL:
+            validate(argument)
+            continue
+        if not argument.required:
+            w.line(f'if {argument.name} is not None:')
+            w.indent()
+        validate(argument)
+        w.line(f'_params.append(({argument.wire_name!r}, {value(argument)}))')
+        if not argument.required:
+            w.dedent()
+
+    w.line('_body = {}')
+    for argument in (*spec.required_body, *spec.optional_body):
+        if not argument.required:
+            w.line(f'if {argument.name} is not None:')
+            w.indent()
+        validate(argument)
+        w.line(f'_body[{argument.wire_name!r}] = {value(argument)}')
+        if not argument.required:
+            w.dedent()
+
+    if timed:
+        w.line('_prepared = _clock()')
+        w.line(f"_timer.record({method_name!r}, 'validate', _validation)")
+        w.line(f"_timer.record({method_name!r}, 'prepare', _prepared - _started - _validation)")
+        w.line('_signing = [0.0]')
+        w.line('_signing_token = _signing_time.set(_signing)')
+        w.line('try:')
+        w.indent()
+
+    # Lets trace configs attribute the request to this method
+    w.line(f'_token = _current_method_name.set({method_name!r})')
+    w.line('try:')
+    w.indent()
+    if http_method in ['POST', 'PUT', 'PATCH']:
+        # Have a body
+        if spec.body_type in ['kv', 'json']:
+            body_argument = 'data' if spec.body_type == 'kv' else 'json'
+            w.line(f"_resp = await self.signed_request({http_method!r}, _endpoint, params=_params, "
+                   f"{body_argument}=_body, headers={{'content-type': {spec.content_type!r}}})")
+        else:
+            w.line(f'raise RuntimeError({f"Unknown body type {spec.body_type!r} in method {method_name!r}"!r})')
+    elif http_method in ['GET', 'DELETE']:
+        # No body for these methods, nor a specific content-type
+        w.line(f'_resp = await self.signed_request({http_method!r}, _endpoint, params=_params, '
+               f'cache_ttl={spec.cache_ttl!r})')
+    else:
+        w.line(f'raise NotImplementedError({f"Unsupported HTTP verb {http_method!r}."!r})')
+    w.dedent()
+    w.line('finally:')
+    w.indent()
+    w.line('_current_method_name.reset(_token)')
+    w.dedent()
+
+    if timed:
+        w.dedent()
+        w.line('finally:')
+        w.indent()
+        w.line('_signing_time.reset(_signing_token)')
+        w.dedent()
+        w.line('_received = _clock()')
+        w.line(f"_timer.record({method_name!r}, 'sign', _signing[0])")
+        w.line(f"_timer.record({method_name!r}, 'request', _received - _prepared - _signing[0])")
+
+    w.line('if self._wants_parsed_response():')
+    w.indent()
+    if timed:
+        w.line('_resp = await self.parse_response(_resp)')
+        w.line(f"_timer.record({method_name!r}, 'parse', _clock() - _received)")
+    else:
+        w.line('return await self.parse_response(_resp)')
+    w.dedent()
+    w.line('return _resp')
+
+    return w.source, namespace
+
+
+def compile_method(spec: EndpointSpec, timed: bool = False) -> Callable:
+    """Compile the function implementing the endpoint of `spec`, see `_generate_method_source`."""
+    source, namespace = _generate_method_source(spec, timed=timed)
+    filename = f"<aiotumblr {spec.method_name}{' (timed)' if timed else ''}>"
+    # Makes the generated source show up in tracebacks and `inspect.getsource`
+    linecache.cache[filename] = (len(source), None, source.splitlines(keepends=True), filename)
+    exec(compile(source, filename, 'exec'), namespace)
+    return namespace[spec.method_name]
+
+
+class _LazyMethod(object):
+    """
+    Stands in for a generated method on the client class until it's first accessed, then builds the method and
+    replaces itself with it. Extensions register all their endpoints this way, so endpoints that are never used cost
+    next to nothing, and used ones run without any indirection after their first access. Placeholders that aren't
+    installed on the class, like the phase-timed variants, keep the built method instead.
+    """
+    __slots__ = ('client', 'name', 'build', 'method')
+
+    def __init__(self, client, name: str, build: Callable[[], Callable]):
+        self.client = client
+        self.name = name
+        self.build = build
+        self.method = None
+
+    def materialize(self) -> Callable:
+        if self.method is None:
+            self.method = self.build()
+            # Unless it was unregistered or replaced in the meantime
+            if self.client.__dict__.get(self.name) is self:
+                setattr(self.client, self.name, self.method)
+        return self.method
+
+    def __get__(self, instance, owner=None):
+        return self.materialize().__get__(instance, owner)
+
+
+def _spec_factory(method_info: Dict[str, Any], params: Optional[Dict[str, Any]] = None,
+                  body: Optional[Dict[str, Any]] = None) -> Callable[[], EndpointSpec]:
+    spec = None
+
+    def get_spec() -> EndpointSpec:
+        nonlocal spec
+        if spec is None:
+            spec = EndpointSpec(method_info, params, body)
+        return spec
+    return get_spec
+
+
+def _install_method(client, method_name: str, get_spec: Callable[[], EndpointSpec]):
+    def build() -> Callable:
+        spec = get_spec()
+        method = compile_method(spec)
+        method.__doc__ = spec.docstring()
+        return method
+
+    setattr(client, method_name, _LazyMethod(client, method_name, build))
+
+    def build_timed() -> Callable:
+        method_timed = compile_method(get_spec(), timed=True)
+
+        @functools.wraps(getattr(client, method_name))
+        async def timed_method(self, *args, **kwargs):
+            # Argument binding happens between here and the start of `method_timed`
+            token = _call_started.set(self.phase_timer.clock())
+            try:
+                return await method_timed(self, *args, **kwargs)
+            finally:
+                _call_started.reset(token)
+        return timed_method
+
+    # Every class keeps its own, so registering on a subclass leaves the classes it derives from alone
+    if '_timed_methods' not in client.__dict__:
+        client._timed_methods = {}
+    # Most clients never time their calls
+    client._timed_methods[method_name] = _LazyMethod(client, method_name, build_timed)
 
-    required_params = []
-    for key in params['required']:
-        req_param = params['data'][key]
-        required_params.append(f""":param {sphinx_format_parameter(key)}: {req_param['description']}
-:type {sphinx_format_parameter(key)}: {req_param['type'].__name__}""")
-    ds_required_params = '\n'.join(required_params)
-
-    optional_params = []
-    for key in params['optional']:
-        opt_param = params['data'][key]
-        optional_params.append(f""":param {sphinx_format_parameter(key)}: {opt_param['description']}
-:type {sphinx_format_parameter(key)}: {opt_param['type'].__name__} or None""")
-    ds_optional_params = '\n'.join(optional_params)
-
-    required_body_args = []
-    for key in body['required']:
-        req_body_arg = body['data'][key]
-        required_body_args.append(f""":param {sphinx_format_parameter(key)}: {req_body_arg['description']}
-:type {sphinx_format_parameter(key)}: {req_body_arg['type'].__name__}""")
-    ds_required_body_args = '\n'.join(required_body_args)
-
-    optional_body_args = []
-    for key in body['optional']:
-        opt_body_arg = body['data'][key]
-        optional_body_args.append(f""":param {sphinx_format_parameter(key)}: {opt_body_arg['description']}
-:type {sphinx_format_parameter(key)}: {opt_body_arg['type'].__name__} or None""")
-    ds_optional_body_args = '\n'.join(optional_body_args)
-
-    ds = f"""{method_info['description_summary']}\n"""
-
-    if method_info['description_long']:
-        ds += f"""\n{method_info['description_long']}\n"""
-
-    if ds_url_params:
-        ds += f"""\n{ds_url_params}"""
-
-    if ds_required_params:
-        ds += f"""\n{ds_required_params}"""
-
-    if ds_optional_params:
-        ds += f"""\n{ds_optional_params}"""
-
-    if ds_required_body_args:
-        ds += f"""\n{ds_required_body_args}"""
-
-    if ds_optional_body_args:
-        ds += f"""\n{ds_optional_body_args}"""
-
-    ds += f"""\n:return: API response for {method_info['method_name']}
-:rtype: `aiohttp.ClientResponse`
-:raises SyntaxError: if required parameter is missing
-:raises ValueError: if supplied parameter fails validation
-"""
 
-    return ds
+def create_method(client, params, body, method_info):
+    _install_method(client, method_info['method_name'], _spec_factory(method_info, params, body))
 
 
-def create_method(client, params, body, method_info):
-    _sig_url_params = []
-    _sig_params_req = []
-    _sig_params_opt = []
-    _sig_body_req = []
-    _sig_body_opt = []
-
-    for _key, _url_param in method_info['url_parameters'].items():
-        _sig_url_params.append(forge.arg(name=_key, type=_url_param['type']))
-
-    if params['data']:
-        for _key, _param_item in params['data'].items():
-            if _param_item['required']:
-                _sig_params_req.append(forge.arg(name=_key, type=_param_item['type']))
-            else:
-                _sig_params_opt.append(forge.kwo(name=_key, type=_param_item['type'], default=None))
+def register_endpoint(client, method_info: Dict[str, Any]):
+    """
+    Register the method of the endpoint `method_info` on `client`, and its iterator if the endpoint is paginated. Both
+    are generated on first access, the endpoint structure isn't even compiled before.
+    """
+    _install_method(client, method_info['method_name'], _spec_factory(method_info))
+    if 'pagination' in method_info:
+        create_iterator(client, method_info)
 
-    if body['data']:
-        for _key, _body_item in body['data'].items():
-            if _body_item['required']:
-                _sig_body_req.append(forge.arg(name=_key, type=_body_item['type']))
-            else:
-                _sig_body_opt.append(forge.kwo(name=_key, type=_body_item['type'], default=None))
-
-    async def inner_method(self, **kwargs):
-        # Verify signature
-        endpoint_signature = {}
-        for url_param, url_param_info in method_info['url_parameters'].items():
-            if url_param not in kwargs:
-                raise SyntaxError(f'Argument {url_param!r} is a required keyword argument.')
-
-            if 'validator' in url_param_info:
-                tested = url_param_info['validator'](kwargs[url_param])
-                if not tested:
-                    # TODO: less generic error messages by abstracting this to the endpoint data structure
-                    raise ValueError(f'Supplied argument {url_param!r} failed to validate')
-
-            endpoint_signature[url_param] = kwargs[url_param]
-        endpoint = method_info['endpoint'].format(**endpoint_signature)
-
-        # Verify params
-        # TODO: DRY
-        params_signature = []
-        for param in params['required']:
-            item = None
-
-            if param not in kwargs:
-                if 'default' not in params['data'][param]:
-                    raise SyntaxError(f'Parameter {param!r} is a required keyword argument')
-                else:
-                    item = params['data'][param]
-
-            if not item:
-                item = kwargs[param]
-
-            if 'validator' in params['data'][param]:
-                tested = params['data'][param]['validator'](item)
-                if not tested:
-                    # TODO: less generic error messages by abstracting this to the endpoint data structure
-                    raise ValueError(f'Supplied argument {param!r} failed to validate')
-
-            if '_internal_name' in params['data'][param]:
-                params_signature.append((params['data'][param]['_internal_name'], format_parameter_value(item)))
-            else:
-                params_signature.append((param, format_parameter_value(item)))
-
-        for param in params['optional']:
-            if param in kwargs and kwargs[param] is not None:
-                if 'validator' in params['data'][param]:
-                    tested = params['data'][param]['validator'](kwargs[param])
-                    if not tested:
-                        # TODO: less generic error messages by abstracting this to the endpoint data structure
-                        raise ValueError(f'Supplied argument {param!r} failed to validate')
-
-                if '_internal_name' in params['data'][param]:
-                    params_signature.append(
-                        (params['data'][param]['_internal_name'], format_parameter_value(kwargs[param])))
-                else:
-                    params_signature.append((param, format_parameter_value(kwargs[param])))
-
-        # Verify body
-        # TODO: DRY
-        body_signature = {}
-        for key in body['required']:
-            item = None
-            if key not in kwargs:
-                if 'default' not in body['data'][key]:
-                    raise SyntaxError(f'Body key {key!r} is a required keyword argument')
-                else:
-                    item = body['data'][key]['default']
-
-            if not item:
-                item = kwargs[key]
-
-            if 'validator' in body['data'][key]:
-                tested = body['data'][key]['validator'](item)
-                if not tested:
-                    # TODO: less generic error messages by abstracting this to the endpoint data structure
-                    raise ValueError(f'Supplied argument {key!r} failed to validate')
-
-            if '_internal_name' in body['data'][key]:
-                body_signature[body['data'][key]['_internal_name']] = item if method_info['body_type'] == 'json' else \
-                    format_parameter_value(item)
+
+def unregister_endpoint(client, method_info: Dict[str, Any]):
+    delattr(client, method_info['method_name'])
+    client.__dict__.get('_timed_methods', {}).pop(method_info['method_name'], None)
+    if 'pagination' in method_info:
+        delattr(client, iterator_name(method_info))
+
+
+def iterator_name(method_info: Dict[str, Any]) -> str:
+    method_name = method_info['method_name']
+    return f"iter_{method_name[4:] if method_name.startswith('get_') else method_name}"
+
+
+def generate_iterator_docstring(method_info: Dict[str, Any]) -> str:
+    pagination = method_info['pagination']
+    ds = f"""Iterate over all `{pagination['items']}` of {method_info['method_name']}, one item at a time
+
+Pages are requested as the iteration goes, reading up to `prefetch` pages ahead. The arguments are those of \
+{method_info['method_name']}, except for the paging parameters, which are managed by the iterator."""
+    if pagination.get('cursor'):
+        if pagination.get('offset'):
+            ds += f""" Paging starts by \
+offset and switches over to the `{pagination['cursor']}` cursor once the offset would exceed \
+{pagination['max_offset']}."""
+        else:
+            ds += f""" Paging is done with the `{pagination['cursor']}` cursor."""
+
+    ds += f"""\n\n:param prefetch: Number of pages to read ahead of the consumer
+:type prefetch: int
+:return: Items of `{pagination['items']}`, as decoded from the API response
+:rtype: async iterator
+:raises aiotumblr.exceptions.TumblrAPIError: if the API returns an error status for one of the pages
+"""
+    return ds
+
+
+def create_iterator(client, method_info):
+    name = iterator_name(method_info)
+    setattr(client, name, _LazyMethod(client, name, functools.partial(build_iterator, method_info)))
+
+
+def build_iterator(method_info: Dict[str, Any]) -> Callable:
+    pagination = method_info['pagination']
+    method_name = method_info['method_name']
+    items_key = pagination['items']
+    offset_param = pagination.get('offset')
+    max_offset = pagination.get('max_offset')
+    cursor_param = pagination.get('cursor')
+    cursor_field = pagination.get('cursor_field')
+
+    async def fetch_pages(self, queue, args, kwargs):
+        offset = (kwargs.pop(offset_param, None) or 0) if offset_param else None
+        use_cursor = cursor_param is not None and (offset_param is None or kwargs.get(cursor_param) is not None)
+        cursor = kwargs.get(cursor_param) if cursor_param else None
+        # The cursor is exclusive and timestamps aren't unique, so pages continue from just after the value of the last
+        # item and the items sharing that value, which were returned already, are left out by id
+        last_value, seen = None, set()
+
+        while True:
+            page_kwargs = dict(kwargs)
+            if use_cursor:
+                page_kwargs.pop(offset_param, None)
+                if cursor is not None:
+                    page_kwargs[cursor_param] = cursor
+            elif offset_param:
+                page_kwargs[offset_param] = offset
+
+            resp = await self.raw_call(method_name, *args, **page_kwargs)
+            payload = await self.parse_response(resp)
+            items = payload.get(items_key) if isinstance(payload, dict) else None
+            if not items:
+                break
+            if use_cursor and seen:
+                items = [item for item in items if item.get('id') not in seen]
+                if not items:
+                    if last_value is None or cursor != last_value + 1:
+                        break
+                    # More items share one cursor value than fit on a page; the rest of them can't be reached, so
+                    # continue with the items before that value
+                    cursor, seen = last_value, set()
+                    continue
+            await queue.put((items, None))
+
+            if cursor_param is not None:
+                value = items[-1].get(cursor_field)
+                if value != last_value:
+                    seen = set()
+                seen.update(item.get('id') for item in items if item.get(cursor_field) == value)
+                last_value = value
+
+            if use_cursor:
+                if last_value is None:
+                    break
+                cursor = last_value + 1
             else:
-                body_signature[key] = item if method_info['body_type'] == 'json' else \
-                    format_parameter_value(item)
-
-        for key in body['optional']:
-            if key in kwargs and kwargs[key] is not None:
-                if 'validator' in body['data'][key]:
-                    tested = body['data'][key]['validator'](kwargs[key])
-                    if not tested:
-                        # TODO: less generic error messages by abstracting this to the endpoint data structure
-                        raise ValueError(f'Supplied argument {key!r} failed to validate')
-
-                if '_internal_name' in body['data'][key]:
-                    body_signature[body['data'][key]['_internal_name']] = kwargs[key] if \
-                        method_info['body_type'] == 'json' else \
-                        format_parameter_value(kwargs[key])
-                else:
-                    body_signature[key] = kwargs[key] if method_info['body_type'] == 'json' else \
-                        format_parameter_value(kwargs[key])
-
-        if method_info['http_method'] in ['POST', 'PUT', 'PATCH']:
-            # Have a body
-            if method_info['body_type'] == 'kv':
-                resp = await self.signed_request(
-                    method_info['http_method'], endpoint, params=params_signature, data=body_signature,
-                    headers={'content-type': method_info['content_type']}
-                )
-            elif method_info['body_type'] == 'json':
-                resp = await self.signed_request(
-                    method_info['http_method'], endpoint, params=params_signature, json=body_signature,
-                    headers={'content-type': method_info['content_type']}
-                )
+                offset += len(items)
+                if max_offset is not None and offset >= max_offset:
+                    if cursor_param is None or last_value is None:
+                        # Nothing to switch over to, this is as far as the API lets us go
+                        break
+                    use_cursor = True
+                    cursor = last_value + 1
+
+    async def inner_iterator(self, *args, prefetch: int = 2, **kwargs):
+        queue = asyncio.Queue(maxsize=max(1, prefetch))
+        done = object()
+
+        async def producer():
+            try:
+                await fetch_pages(self, queue, args, kwargs)
+            except Exception as e:
+                await queue.put((None, e))
             else:
-                raise RuntimeError(
-                    f'Unknown body type {method_info["body_type"]!r} in method {method_info["method_name"]!r}'
-                )
-        elif method_info['http_method'] in ['GET', 'DELETE']:
-            # No body for these methods, nor a specific content-type
-            resp = await self.signed_request(
-                method_info['http_method'], endpoint, params=params_signature
-            )
-        else:
-            raise NotImplementedError(
-                f'Unsupported HTTP verb {method_info["http_method"]!r}.'
-            )
-
-        return resp
-
-    revised = forge.sign(
-        forge.pos(name='self'),
-        *_sig_url_params,
-        *_sig_params_req,
-        *_sig_body_req,
-        *_sig_params_opt,
-        *_sig_body_opt,
-    )(inner_method)
-    revised.__name__ = method_info['method_name']
-
-    revised.__doc__ = generate_docstring(params, body, method_info)
-    setattr(client, method_info['method_name'], revised)
+                await queue.put((done, None))
+
+        task = asyncio.ensure_future(producer())
+        try:
+            while True:
+                items, error = await queue.get()
+                if error is not None:
+                    raise error
+                if items is done:
+                    return
+                for item in items:
+                    yield item
+        finally:
+            task.cancel()
+
+    inner_iterator.__name__ = iterator_name(method_info)
+    inner_iterator.__doc__ = generate_iterator_docstring(method_info)
+    return inner_iterator
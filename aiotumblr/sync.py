@@ -0,0 +1,156 @@
+# encoding=utf-8
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+import threading
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from .core import TumblrClient
+from .utils.scheduling import request_priority
+
+__all__ = ['SyncTumblrClient']
+
+T = TypeVar('T')
+
+
+async def _await(awaitable: Awaitable[T], priority: int) -> T:
+    # `run_coroutine_threadsafe` only takes coroutines, not any awaitable (e.g. the `__anext__` of async generators).
+    # The coroutine runs in a context of the loop thread, so the priority of the calling thread is carried over here.
+    request_priority.set(priority)
+    return await awaitable
+
+
+class _LoopThread(object):
+    """Event loop running forever in a daemon thread of its own."""
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='aiotumblr-loop', daemon=True)
+        self.thread.start()
+        self._started.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+
+    @property
+    def running(self) -> bool:
+        return self.thread.is_alive() and not self.loop.is_closed()
+
+    def run(self, awaitable: Awaitable[T], timeout: Optional[float] = None) -> T:
+        if threading.current_thread() is self.thread:
+            raise RuntimeError('Blocking calls can\'t be made from the event loop thread itself.')
+        if not self.running:
+            raise RuntimeError('The event loop of this client has been stopped.')
+
+        future = asyncio.run_coroutine_threadsafe(_await(awaitable, request_priority.get()), self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self):
+        if not self.running:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class SyncTumblrClient(object):
+    """
+    Blocking facade over `TumblrClient`, for threaded applications.
+
+    A single event loop runs in a background thread with one `TumblrClient` on it, so all calls share its session and
+    connection pool no matter which thread they come from. Any number of threads can call it at the same time. Every
+    coroutine method of the client, including the ones of registered extensions, is available as a blocking method
+    taking the same arguments; async iterators (e.g. `iter_blog_posts`, `stream_items` and `bulk`) become regular
+    iterators. Since responses can't be read outside the loop, responses are always parsed, as with
+    `parse_responses=True`. Calls made inside `with client.priority(...)` run with that priority, as on `TumblrClient`.
+
+    Close the client with `close`, or use it as a context manager.
+
+    :param args: Positional arguments for `TumblrClient`
+    :param timeout: Seconds a blocking call may take before raising `concurrent.futures.TimeoutError`, None to wait
+        indefinitely
+    :param kwargs: Keyword arguments for `TumblrClient`
+    """
+    def __init__(self, *args, timeout: Optional[float] = None, **kwargs):
+        if not kwargs.get('parse_responses', True):
+            raise ValueError('SyncTumblrClient always parses responses.')
+        kwargs['parse_responses'] = True
+
+        self.client = TumblrClient(*args, **kwargs)
+        self.timeout = timeout
+        self._loop_thread = _LoopThread()
+        self._owns_loop = True
+
+    @classmethod
+    def _wrap(cls, client: TumblrClient, loop_thread: _LoopThread, timeout: Optional[float]) -> 'SyncTumblrClient':
+        facade = cls.__new__(cls)
+        facade.client = client
+        facade.timeout = timeout
+        facade._loop_thread = loop_thread
+        facade._owns_loop = False
+        return facade
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop_thread.loop
+
+    def run(self, awaitable: Awaitable[T]) -> T:
+        """Run `awaitable` on the event loop of the client and wait for its result."""
+        return self._loop_thread.run(awaitable, self.timeout)
+
+    def _iterate(self, iterator) -> Iterator[Any]:
+        try:
+            while True:
+                try:
+                    yield self.run(iterator.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            aclose = getattr(iterator, 'aclose', None)
+            if aclose is not None and self._loop_thread.running:
+                self.run(aclose())
+
+    def _blocking(self, method: Callable) -> Callable:
+        @functools.wraps(method)
+        def blocking_method(*args, **kwargs):
+            result = method(*args, **kwargs)
+            if inspect.isawaitable(result):
+                return self.run(result)
+            if hasattr(result, '__anext__'):
+                return self._iterate(result)
+            return result
+        return blocking_method
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not found on the facade itself
+        attribute = getattr(self.client, name)
+        if callable(attribute) and not inspect.isclass(attribute):
+            return self._blocking(attribute)
+        return attribute
+
+    def for_user(self, resource_owner_key: str, resource_owner_secret: str) -> 'SyncTumblrClient':
+        """Blocking counterpart of `TumblrClient.for_user`, sharing the event loop and session of this client."""
+        return self._wrap(self.client.for_user(resource_owner_key, resource_owner_secret), self._loop_thread,
+                          self.timeout)
+
+    def close(self):
+        """Close the session and stop the event loop; a no-op for clients created with `for_user`."""
+        if not self._owns_loop or not self._loop_thread.running:
+            return
+        try:
+            self.run(self.client.close_connection())
+        finally:
+            self._loop_thread.stop()
+
+    def __enter__(self) -> 'SyncTumblrClient':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
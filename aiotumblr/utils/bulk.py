@@ -0,0 +1,107 @@
+# encoding=utf-8
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+__all__ = ['BulkResult', 'run_bulk']
+
+
+class BulkResult(object):
+    """Outcome of one call of a bulk run: either `result` or `error` is set."""
+    __slots__ = ('index', 'kwargs', 'result', 'error')
+
+    def __init__(self, index: int, kwargs: Dict[str, Any], result: Any = None, error: Optional[BaseException] = None):
+        self.index = index
+        self.kwargs = kwargs
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        outcome = f'result={self.result!r}' if self.ok else f'error={self.error!r}'
+        return f'<BulkResult index={self.index} {outcome}>'
+
+
+async def _call(method, index: int, kwargs: Dict[str, Any], semaphore: asyncio.Semaphore) -> BulkResult:
+    async with semaphore:
+        try:
+            return BulkResult(index, kwargs, result=await method(**kwargs))
+        except Exception as e:
+            return BulkResult(index, kwargs, error=e)
+
+
+async def run_bulk(client, method_name: str, kwargs_iterable: Iterable[Dict[str, Any]], concurrency: int = 10,
+                   ordered: bool = False) -> AsyncIterator[BulkResult]:
+    """
+    Call the registered endpoint method `method_name` once for every set of keyword arguments.
+
+    At most `concurrency` calls run at the same time. Arguments are taken from `kwargs_iterable` lazily, so it can be
+    a generator over millions of items. Exceptions are caught and reported in the `BulkResult` of the call that
+    raised them, and don't stop the run. When the client doesn't parse responses, every result is an unread
+    `aiohttp.ClientResponse` holding on to its connection until it has been read or released.
+
+    :param client: `TumblrClient` the method is registered on
+    :param method_name: Name of the endpoint method, e.g. `'like_post'`
+    :param kwargs_iterable: Keyword arguments for each call
+    :param concurrency: Maximum number of calls in flight
+    :param ordered: Yield results in input order instead of completion order
+    :return: One `BulkResult` per call
+    """
+    if concurrency < 1:
+        raise ValueError('concurrency should be at least 1.')
+
+    method = getattr(client, method_name)
+    semaphore = asyncio.Semaphore(concurrency)
+    arguments = enumerate(kwargs_iterable)
+    # Ordered runs keep some finished calls around while waiting for slower earlier ones; allow a few more scheduled
+    # calls than running ones so a single slow call doesn't stall the rest
+    max_scheduled = concurrency * 4 if ordered else concurrency
+
+    def schedule() -> Optional[asyncio.Future]:
+        try:
+            index, kwargs = next(arguments)
+        except StopIteration:
+            return None
+        return asyncio.ensure_future(_call(method, index, kwargs, semaphore))
+
+    if ordered:
+        queue = deque()
+        try:
+            while len(queue) < max_scheduled:
+                future = schedule()
+                if future is None:
+                    break
+                queue.append(future)
+
+            while queue:
+                result = await queue.popleft()
+                future = schedule()
+                if future is not None:
+                    queue.append(future)
+                yield result
+        finally:
+            for future in queue:
+                future.cancel()
+    else:
+        pending = set()
+        try:
+            while len(pending) < max_scheduled:
+                future = schedule()
+                if future is None:
+                    break
+                pending.add(future)
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for _ in done:
+                    future = schedule()
+                    if future is not None:
+                        pending.add(future)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
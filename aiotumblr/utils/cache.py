@@ -0,0 +1,306 @@
+# encoding=utf-8
+import asyncio
+import json
+import os.path
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from multidict import CIMultiDict, CIMultiDictProxy
+
+__all__ = ['CacheEntry', 'CachedResponse', 'ResponseCache', 'MemoryResponseCache', 'SQLiteResponseCache']
+
+T = TypeVar('T')
+
+# Rough per-entry overhead of the key, headers and bookkeeping, on top of the body itself
+_ENTRY_OVERHEAD = 512
+
+
+class CacheEntry(object):
+    __slots__ = ('status', 'reason', 'headers', 'body', 'expires_at')
+
+    def __init__(self, status: int, reason: str, headers: Dict[str, str], body: bytes, expires_at: float):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+    def _header(self, name: str) -> Optional[str]:
+        name = name.lower()
+        return next((v for k, v in self.headers.items() if k.lower() == name), None)
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self._header('ETag')
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self._header('Last-Modified')
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + _ENTRY_OVERHEAD
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'status': self.status, 'reason': self.reason, 'headers': self.headers, 'expires_at': self.expires_at}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], body: bytes) -> 'CacheEntry':
+        return cls(data['status'], data['reason'], data['headers'], body, data['expires_at'])
+
+
+class CachedResponse(object):
+    """Stand-in for `aiohttp.ClientResponse` returned when a request is answered from a `ResponseCache`."""
+    from_cache = True
+
+    def __init__(self, entry: CacheEntry, method: str = 'GET', url: Optional[str] = None):
+        self.method = method
+        self.url = url
+        self.status = entry.status
+        self.reason = entry.reason
+        self.headers = CIMultiDictProxy(CIMultiDict(entry.headers))
+        self._body = entry.body
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get('Content-Type', 'application/octet-stream').split(';')[0].strip().lower()
+
+    def get_encoding(self) -> str:
+        for part in self.headers.get('Content-Type', '').split(';')[1:]:
+            key, _, value = part.strip().partition('=')
+            if key.lower() == 'charset' and value:
+                return value.strip('"')
+        return 'utf-8'
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: Optional[str] = None) -> str:
+        return self._body.decode(encoding or self.get_encoding())
+
+    async def json(self, *, loads=json.loads, **kwargs) -> Any:
+        return loads(self._body)
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def __aenter__(self) -> 'CachedResponse':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class ResponseCache(object):
+    """
+    Storage backend for cached GET responses of `TumblrClient`.
+
+    Expiry times are wall-clock timestamps, so entries stay meaningful across processes. Stale entries may be returned
+    by `get`; the client uses their `ETag`/`Last-Modified` headers to revalidate them.
+    """
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError()
+
+    async def set(self, key: str, entry: CacheEntry):
+        raise NotImplementedError()
+
+    async def delete(self, key: str):
+        raise NotImplementedError()
+
+    async def clear(self):
+        raise NotImplementedError()
+
+    async def close(self):
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    """
+    In-memory LRU response cache, bounded by the total size of the cached bodies.
+
+    :param max_bytes: Maximum size of all entries together; least recently used entries are evicted first
+    """
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # type: OrderedDict[str, CacheEntry]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry):
+        await self.delete(key)
+        if entry.size > self.max_bytes:
+            return
+
+        self._entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+    async def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    async def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    Persistent response cache in a SQLite database, safe to share between processes and across restarts.
+
+    Bodies are stored zlib-compressed. The database runs in WAL mode, so readers in other processes are not blocked by
+    a writer, and is memory-mapped for cheap reads. All database work happens on a single background thread to keep
+    the event loop free. Entries are dropped `max_stale` seconds after they expired, and least recently used entries
+    are evicted once the compressed size of all entries exceeds `max_bytes`.
+
+    :param path: Path of the database file; created when missing
+    :param max_bytes: Maximum total size of the stored (compressed) bodies
+    :param max_stale: Seconds an expired entry is kept around for revalidation
+    :param compress_level: zlib compression level, 0 to store bodies uncompressed
+    :param mmap_size: Bytes of the database file SQLite may memory-map
+    """
+    # Eviction needs a full scan of the sizes, so it's only done every so many writes
+    evict_every = 64
+    # Last-access times are only written back when older than this, to limit write contention between processes
+    touch_interval = 60.0
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, max_stale: float = 86400.0,
+                 compress_level: int = 6, mmap_size: int = 256 * 1024 * 1024):
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self.max_stale = max_stale
+        self.compress_level = compress_level
+        self.mmap_size = mmap_size
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='aiotumblr-cache')
+        self._connection = None  # type: Optional[sqlite3.Connection]
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # `timeout` doubles as busy timeout while another process holds the write lock
+            connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+            connection.execute('CREATE TABLE IF NOT EXISTS responses ('
+                               'key TEXT PRIMARY KEY, meta TEXT NOT NULL, body BLOB NOT NULL, '
+                               'compressed INTEGER NOT NULL, size INTEGER NOT NULL, '
+                               'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _get(self, key: str) -> Optional[CacheEntry]:
+        connection = self._connect()
+        row = connection.execute('SELECT meta, body, compressed, expires_at, accessed_at FROM responses WHERE key = ?',
+                                 (key,)).fetchone()
+        if row is None:
+            return None
+
+        meta, body, compressed, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at + self.max_stale < now:
+            connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+            return None
+        if now - accessed_at > self.touch_interval:
+            connection.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+
+        data = json.loads(meta)
+        data['expires_at'] = expires_at
+        return CacheEntry.from_dict(data, zlib.decompress(body) if compressed else body)
+
+    def _set(self, key: str, entry: CacheEntry):
+        connection = self._connect()
+        body = entry.body
+        compressed = self.compress_level > 0
+        if compressed:
+            body = zlib.compress(body, self.compress_level)
+        size = len(body) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        connection.execute('INSERT OR REPLACE INTO responses '
+                           '(key, meta, body, compressed, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           (key, json.dumps(entry.to_dict()), body, int(compressed), size, entry.expires_at,
+                            time.time()))
+
+        self._writes += 1
+        if self._writes % self.evict_every == 0:
+            self._evict()
+
+    def _evict(self):
+        connection = self._connect()
+        connection.execute('DELETE FROM responses WHERE expires_at < ?', (time.time() - self.max_stale,))
+
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        evict = []
+        for key, size in connection.execute('SELECT key, size FROM responses ORDER BY accessed_at'):
+            evict.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        connection.executemany('DELETE FROM responses WHERE key = ?', evict)
+
+    def _delete(self, key: str):
+        self._connect().execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def _clear(self):
+        self._connect().execute('DELETE FROM responses')
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        return await self._run(self._get, key)
+
+    async def set(self, key: str, entry: CacheEntry):
+        await self._run(self._set, key, entry)
+
+    async def delete(self, key: str):
+        await self._run(self._delete, key)
+
+    async def clear(self):
+        await self._run(self._clear)
+
+    async def evict(self):
+        """Drop entries that are too stale, and the least recently used ones while over `max_bytes`."""
+        await self._run(self._evict)
+
+    async def close(self):
+        await self._run(self._close)
+        self._executor.shutdown(wait=True)
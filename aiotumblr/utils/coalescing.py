@@ -0,0 +1,29 @@
+# encoding=utf-8
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+__all__ = ['RequestCoalescer']
+
+T = TypeVar('T')
+
+
+class RequestCoalescer(object):
+    """
+    Single-flight helper: concurrent calls with the same key share one execution of the underlying coroutine.
+
+    The coroutine runs in its own task, so a caller that gets cancelled doesn't cancel the work for the others.
+    Once it finishes, the key is forgotten and the next call starts a fresh execution.
+    """
+    def __init__(self):
+        self._in_flight = {}  # type: Dict[Hashable, asyncio.Future]
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
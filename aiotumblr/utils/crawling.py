@@ -0,0 +1,95 @@
+# encoding=utf-8
+import asyncio
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+__all__ = ['crawl_blog_posts']
+
+log = logging.getLogger(__name__)
+
+
+async def _fetch_window(client, blog_identifier: str, offset: int, limit: int,
+                        kwargs: Dict[str, Any]) -> List[Dict[str, Any]]:
+    resp = await client.raw_call('get_blog_posts', blog_identifier, offset=offset, limit=limit, **kwargs)
+    payload = await client.parse_response(resp)
+    return payload.get('posts') or []
+
+
+async def crawl_blog_posts(client, blog_identifier: str, concurrency: int = 8, page_size: int = 20, overlap: int = 2,
+                           total_posts: Optional[int] = None, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Crawl all posts of a blog by fetching offset windows of `get_blog_posts` concurrently.
+
+    The offset range is split in windows of `page_size` posts, of which at most `concurrency` are requested at the
+    same time. Consecutive windows overlap by `overlap` posts. Posts published or deleted mid-crawl shift the offsets;
+    the overlap absorbs small shifts, and when a window shares no post with its predecessor the gap in between is
+    fetched again before continuing. Posts are yielded in blog order without duplicates. If the last window is still
+    full, the crawl keeps going past the initial post count until it runs dry.
+
+    :param client: `TumblrClient` with the public API registered
+    :param blog_identifier: The blog to crawl
+    :param concurrency: Maximum number of windows requested at the same time
+    :param page_size: Posts per window: 1–20, inclusive
+    :param overlap: Posts shared by consecutive windows, smaller than `page_size`; 0 disables gap detection
+    :param total_posts: Number of posts of the blog; fetched with `get_blog_info` when omitted
+    :param kwargs: Further arguments for `get_blog_posts`, e.g. `reblog_info` or `filter_`
+    :return: Posts as decoded from the API responses, newest first
+    """
+    if concurrency < 1:
+        raise ValueError('concurrency should be at least 1.')
+    if not 0 <= overlap < page_size:
+        raise ValueError('overlap should be at least 0 and smaller than page_size.')
+
+    if total_posts is None:
+        resp = await client.raw_call('get_blog_info', blog_identifier)
+        total_posts = (await client.parse_response(resp))['blog']['posts']
+    log.debug(f'Crawling {total_posts} posts of {blog_identifier!r} with {concurrency} concurrent windows')
+
+    step = page_size - overlap
+    seen = set()
+    next_offset = 0
+    pending = deque()  # type: Deque[Tuple[int, asyncio.Future]]
+
+    def schedule():
+        nonlocal next_offset
+        future = asyncio.ensure_future(_fetch_window(client, blog_identifier, next_offset, page_size, kwargs))
+        pending.append((next_offset, future))
+        next_offset += step
+
+    try:
+        while next_offset < total_posts and len(pending) < concurrency:
+            schedule()
+
+        while pending:
+            offset, future = pending.popleft()
+            posts = await future
+
+            if next_offset < total_posts:
+                schedule()
+            elif not pending and len(posts) == page_size:
+                # Posts published during the crawl pushed older ones past the initial count
+                schedule()
+
+            if overlap and seen and posts and not any(post['id'] in seen for post in posts):
+                # Too many posts were published between fetching this window and the previous one; walk back from
+                # this window until reaching known posts again, and emit what was skipped first
+                repaired = []
+                repair_offset = offset
+                while repair_offset > 0:
+                    repair_offset = max(0, repair_offset - step)
+                    window = await _fetch_window(client, blog_identifier, repair_offset, page_size, kwargs)
+                    repaired.insert(0, window)
+                    if any(post['id'] in seen for post in window):
+                        break
+                log.debug(f'Refetched {len(repaired)} windows before offset {offset} of {blog_identifier!r}')
+                posts = [post for window in repaired for post in window] + posts
+
+            for post in posts:
+                if post['id'] in seen:
+                    continue
+                seen.add(post['id'])
+                yield post
+    finally:
+        for _, future in pending:
+            future.cancel()
@@ -0,0 +1,19 @@
+# encoding=utf-8
+import json
+from typing import Any, Callable, Union
+
+__all__ = ['JSONLoads', 'default_json_loads']
+
+JSONLoads = Callable[[Union[bytes, str]], Any]
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back on the standard library
+    orjson = None
+
+
+def default_json_loads() -> JSONLoads:
+    """Return the fastest available JSON decoder; `orjson.loads` when installed, `json.loads` otherwise."""
+    if orjson is not None:
+        return orjson.loads
+    return json.loads
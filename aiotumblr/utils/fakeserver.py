@@ -0,0 +1,494 @@
+# encoding=utf-8
+import asyncio
+import json
+import logging
+import math
+import random
+import re
+import sys
+import time
+import weakref
+import zlib
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from aiohttp import web
+from oauthlib.oauth1.rfc5849.signature import (base_string_uri, collect_parameters, normalize_parameters,
+                                               sign_hmac_sha1, signature_base_string)
+from oauthlib.oauth1.rfc5849.utils import parse_authorization_header
+from oauthlib.common import safe_string_equals, unquote
+
+from aiotumblr.extensions import Extension, PublicAPI
+from aiotumblr.extensions.spec import QUERY, EndpointSpec
+
+__all__ = ['constant_latency', 'uniform_latency', 'lognormal_latency', 'FakeTumblrServer']
+
+log = logging.getLogger(__name__)
+
+Latency = Callable[[], float]
+Payload = Callable[[Dict[str, Any], Mapping[str, str], Any], Any]
+
+_REASONS = {
+    200: 'OK',
+    201: 'Created',
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    403: 'Forbidden',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    429: 'Limit Exceeded',
+    500: 'Internal Server Error',
+    502: 'Bad Gateway',
+    503: 'Service Unavailable',
+}
+
+# Fake content: the newest post of every blog is from `_EPOCH`, older posts follow every `_POST_INTERVAL` seconds
+_EPOCH = 1600000000
+_POST_INTERVAL = 3600
+_PAGE_LIMIT = 20
+# Response keys holding the number of items of paginated endpoints, where they don't follow `total_{items}`
+_TOTAL_KEYS = {
+    'liked_posts': 'liked_count',
+}
+
+
+def constant_latency(seconds: float) -> Latency:
+    """Every response takes `seconds`."""
+    return lambda: seconds
+
+
+def uniform_latency(low: float, high: float) -> Latency:
+    """Response times spread evenly between `low` and `high` seconds."""
+    return lambda: random.uniform(low, high)
+
+
+def lognormal_latency(median: float, sigma: float = 0.5, maximum: Optional[float] = None) -> Latency:
+    """
+    Log-normally distributed response times, i.e. mostly around `median` seconds with a long tail of slow responses,
+    as seen from real APIs. A larger `sigma` gives a longer tail; `maximum` cuts it off.
+    """
+    mu = math.log(median)
+
+    def latency() -> float:
+        seconds = random.lognormvariate(mu, sigma)
+        return seconds if maximum is None else min(seconds, maximum)
+    return latency
+
+
+def _blog_name(blog_identifier: str) -> str:
+    if blog_identifier.endswith('.tumblr.com'):
+        return blog_identifier[:-len('.tumblr.com')]
+    return blog_identifier
+
+
+def _seed(name: str) -> int:
+    return zlib.crc32(name.encode('utf-8'))
+
+
+def _blog(name: str, posts: int) -> Dict[str, Any]:
+    return {
+        'name': name,
+        'title': name.replace('-', ' ').title(),
+        'url': f'https://{name}.tumblr.com/',
+        'uuid': f't:{_seed(name):08x}',
+        'posts': posts,
+        'updated': _EPOCH,
+        'description': f'Posts of {name}, served by a fake Tumblr.',
+        'ask': False,
+        'ask_anon': False,
+        'likes': posts // 2,
+        'is_nsfw': False,
+    }
+
+
+def _post_id(name: str, index: int) -> int:
+    # Newest first, like the real thing
+    return 600000000000 + _seed(name) % 100000000 * 1000 - index
+
+
+def _post(name: str, index: int) -> Dict[str, Any]:
+    post_id = _post_id(name, index)
+    timestamp = _EPOCH - index * _POST_INTERVAL
+    return {
+        'type': 'text',
+        'blog_name': name,
+        'id': post_id,
+        'id_string': str(post_id),
+        'post_url': f'https://{name}.tumblr.com/post/{post_id}',
+        'slug': f'post-{index}',
+        'date': time.strftime('%Y-%m-%d %H:%M:%S GMT', time.gmtime(timestamp)),
+        'timestamp': timestamp,
+        'state': 'published',
+        'format': 'html',
+        'reblog_key': f'{post_id % 100000000:08d}',
+        'tags': ['aiotumblr', f'tag-{index % 10}'],
+        'note_count': index % 50,
+        'title': f'Post {index} of {name}',
+        'body': f'<p>Body of post {index} of {name}.</p>',
+    }
+
+
+def _item(items_key: str, name: str, index: int) -> Dict[str, Any]:
+    if items_key == 'liked_posts':
+        item = _post(f'{name}-likes-{index % 7}', index)
+        item['liked_timestamp'] = _EPOCH - index * _POST_INTERVAL
+        return item
+    if items_key in ('blogs', 'users'):
+        other = f'{name}-friend-{index}'
+        item = {'name': other, 'url': f'https://{other}.tumblr.com/', 'updated': _EPOCH - index * _POST_INTERVAL}
+        if items_key == 'blogs':
+            item.update(title=other.title(), uuid=f't:{_seed(other):08x}', description='')
+        else:
+            item['following'] = bool(index % 2)
+        return item
+    return _post(name, index)
+
+
+def _int_param(params: Mapping[str, str], name: str, default: Optional[int] = None) -> Optional[int]:
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _page_start(pagination: Dict[str, Any], name: str, params: Mapping[str, str]) -> int:
+    cursor_param = pagination.get('cursor')
+    cursor = _int_param(params, cursor_param) if cursor_param else None
+    if cursor is None:
+        return max(0, _int_param(params, pagination.get('offset') or 'offset', 0))
+
+    # First item with a cursor field below the cursor
+    if pagination.get('cursor_field') == 'id':
+        return max(0, _post_id(name, 0) - cursor + 1)
+    return max(0, (_EPOCH - cursor) // _POST_INTERVAL + 1)
+
+
+class _Route(object):
+    """An endpoint compiled into a URL pattern, with the required parameters and body keys it checks."""
+    __slots__ = ('spec', 'pattern', 'url_arguments', 'required_params', 'required_body')
+
+    def __init__(self, spec: EndpointSpec):
+        self.spec = spec
+        self.pattern = re.compile(''.join(
+            re.escape(part) if isinstance(part, str) else f'(?P<{part.wire_name}>[^/]+)' for part in spec.endpoint_parts
+        ) + '$')
+        self.url_arguments = {part.wire_name: part for part in spec.endpoint_parts if not isinstance(part, str)}
+        self.required_params = [argument.wire_name for argument in spec.required_params if argument.location == QUERY]
+        self.required_body = [argument.wire_name for argument in spec.required_body] if spec.body_type else []
+
+    @property
+    def specificity(self) -> int:
+        return len(self.url_arguments)
+
+    def match(self, path: str) -> Optional[Dict[str, Any]]:
+        match = self.pattern.match(path)
+        if match is None:
+            return None
+
+        url_params = {}
+        for name, value in match.groupdict().items():
+            argument = self.url_arguments[name]
+            try:
+                value = argument.type(value)
+                valid = argument.validator is None or argument.validator(value)
+            except (TypeError, ValueError):
+                return None
+            if not valid:
+                # E.g. `posts/queue` isn't a post with ID `queue`
+                return None
+            url_params[name] = value
+        return url_params
+
+
+def _extension_endpoints(extension: Extension) -> List[Dict[str, Any]]:
+    return getattr(sys.modules[extension.__module__], '_ENDPOINTS', [])
+
+
+class FakeTumblrServer(object):
+    """
+    Local stand-in for the Tumblr API, for load and soak testing `TumblrClient` without touching the real thing.
+
+    Routes are generated from the `_ENDPOINTS` specs of the given extensions, so every generated method of the client
+    has a counterpart. Blogs are made up on the fly: every blog has `posts_per_blog` posts, with deterministic IDs and
+    timestamps so offset and cursor pagination work as they do on Tumblr. Required parameters and the validators of
+    URL parameters are checked. Responses can be slowed down with a latency distribution (e.g. `lognormal_latency`),
+    and failures injected per status with `errors`, e.g. `{503: 0.01}` to answer 1% of the requests with a 503.
+
+    Every consumer key has a budget of `per_hour` and `per_day` requests, reported in `X-Ratelimit-*` headers and
+    enforced with a 429 once spent. When `consumers` maps consumer keys to secrets, the OAuth signature of every
+    request is checked against them, and against `tokens` for requests signed with a resource owner key; requests
+    with unknown keys or a wrong signature get a 401.
+
+    Point a client at the server by setting its `api_base_url` to `url` once the server is started::
+
+        async with FakeTumblrServer(latency=lognormal_latency(0.05)) as server:
+            client = TumblrClient('key', 'secret')
+            client.api_base_url = server.url
+            ...
+
+    The server counts requests per method, statuses and client connections in `requests`, `statuses` and
+    `connections`, to check how the client behaves.
+
+    :param extensions: Extensions whose endpoints are served; defaults to the public API
+    :param consumers: Consumer secrets by consumer key; None to accept any key without checking signatures
+    :param tokens: Resource owner secrets by resource owner key
+    :param latency: Function returning the seconds each response is delayed
+    :param errors: Probability by status of answering a request with that error instead
+    :param disconnect_rate: Probability of closing the connection instead of answering
+    :param per_hour: Requests per hour of each consumer key; None for no limit
+    :param per_day: Requests per day of each consumer key; None for no limit
+    :param posts_per_blog: Posts of every blog, and items of every other paginated list
+    :param payloads: Functions building the response of a method by method name, overriding the fake content;
+        called with the URL parameters, the query parameters and the request body
+    """
+    def __init__(self, extensions: Optional[Iterable[Extension]] = None, consumers: Optional[Dict[str, str]] = None,
+                 tokens: Optional[Dict[str, str]] = None, latency: Optional[Latency] = None,
+                 errors: Optional[Dict[int, float]] = None, disconnect_rate: float = 0.0,
+                 per_hour: Optional[int] = 1000, per_day: Optional[int] = 5000, posts_per_blog: int = 200,
+                 payloads: Optional[Dict[str, Payload]] = None):
+        self.consumers = consumers
+        self.tokens = dict(tokens or {})
+        self.latency = latency
+        self.errors = dict(errors or {})
+        self.disconnect_rate = disconnect_rate
+        self.budgets = {'perhour': (per_hour, 3600), 'perday': (per_day, 86400)}
+        self.posts_per_blog = posts_per_blog
+        self.payloads = dict(payloads or {})
+
+        routes = [
+            _Route(EndpointSpec(method_info))
+            for extension in (extensions if extensions is not None else [PublicAPI])
+            for method_info in _extension_endpoints(extension)
+        ]
+        # Static paths before parameters, e.g. `posts/queue` before `posts/{post_id}`; sorting is stable
+        self.routes = sorted(routes, key=lambda route: route.specificity)
+
+        self.app = web.Application()
+        self.app.router.add_route('*', '/v2/{path:.*}', self._handle)
+        self._runner = None  # type: Optional[web.AppRunner]
+        self.url = None  # type: Optional[str]
+
+        self._used = {}  # type: Dict[Tuple[str, str], Tuple[int, int]]
+        self._transports = weakref.WeakSet()
+        self.requests = Counter()  # type: Counter
+        self.statuses = Counter()  # type: Counter
+        self.connections = 0
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start listening, on a free port unless `port` is given, and return the API base URL to use."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f'http://{host}:{port}/v2/'
+        log.debug(f'Fake Tumblr listening on {self.url}')
+        return self.url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> 'FakeTumblrServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def reset_stats(self):
+        self.requests.clear()
+        self.statuses.clear()
+        self.connections = 0
+
+    @staticmethod
+    def _response(status: int, response: Any = None, headers: Optional[Dict[str, str]] = None,
+                  errors: Optional[List[Dict[str, Any]]] = None) -> web.Response:
+        msg = _REASONS.get(status, 'Error')
+        data = {'meta': {'status': status, 'msg': msg}, 'response': response if response is not None else []}
+        if errors:
+            data['errors'] = errors
+        return web.Response(status=status, reason=msg, text=json.dumps(data), content_type='application/json',
+                            headers=headers)
+
+    def _error(self, status: int, detail: str, headers: Optional[Dict[str, str]] = None) -> web.Response:
+        return self._response(status, errors=[{'title': _REASONS.get(status, 'Error'), 'code': 0, 'detail': detail}],
+                              headers=headers)
+
+    def _resolve(self, http_method: str, path: str) -> Tuple[Optional[_Route], Optional[Dict[str, Any]], bool]:
+        path_found = False
+        for route in self.routes:
+            url_params = route.match(path)
+            if url_params is None:
+                continue
+            if route.spec.http_method == http_method:
+                return route, url_params, True
+            path_found = True
+        return None, None, path_found
+
+    def _check_signature(self, request: web.Request, form: Optional[Mapping[str, str]]) -> Tuple[Optional[str], str]:
+        """Consumer key of the request, and why it was rejected if it was."""
+        authorization = request.headers.get('Authorization', '')
+        if authorization.startswith('OAuth '):
+            oauth_params = dict(parse_authorization_header(authorization))
+        else:
+            oauth_params = {k: v for k, v in request.query.items() if k.startswith('oauth_')}
+        oauth_params = {k: unquote(v) for k, v in oauth_params.items()}
+        consumer_key = oauth_params.get('oauth_consumer_key') or request.query.get('api_key')
+        if not consumer_key:
+            return None, 'No OAuth credentials.'
+        if self.consumers is None:
+            return consumer_key, ''
+        if consumer_key not in self.consumers:
+            return None, 'Unknown consumer key.'
+
+        token = oauth_params.get('oauth_token')
+        if token is not None and token not in self.tokens:
+            return None, 'Unknown resource owner key.'
+        if 'oauth_signature' not in oauth_params:
+            # Public read with only the `api_key`
+            return consumer_key, ''
+
+        # oauthlib decodes the query itself, so it needs the query string as sent rather than aiohttp's decoded one
+        params = collect_parameters(uri_query=request.rel_url.raw_query_string,
+                                    body=list(form.items()) if form else None, headers=dict(request.headers),
+                                    exclude_oauth_signature=True)
+        base_string = signature_base_string(request.method, base_string_uri(str(request.url)),
+                                            normalize_parameters(params))
+        expected = sign_hmac_sha1(base_string, self.consumers[consumer_key], self.tokens.get(token, ''))
+        if not safe_string_equals(expected, oauth_params['oauth_signature']):
+            return None, 'Invalid OAuth signature.'
+        return consumer_key, ''
+
+    def _rate_limit(self, consumer_key: str) -> Tuple[bool, Dict[str, str]]:
+        """Count the request against the budgets of `consumer_key`; whether it's allowed, and the headers to send."""
+        now = int(time.time())
+        windows = []
+        for window, (limit, period) in self.budgets.items():
+            if limit is None:
+                continue
+            window_start = now - now % period
+            started, used = self._used.get((consumer_key, window), (window_start, 0))
+            if started != window_start:
+                used = 0
+            windows.append((window, limit, window_start, window_start + period - now, used))
+
+        allowed = all(used < limit for _, limit, _, _, used in windows)
+        headers = {}
+        for window, limit, window_start, reset, used in windows:
+            if allowed:
+                used += 1
+            self._used[(consumer_key, window)] = (window_start, used)
+            prefix = f'X-Ratelimit-{window.capitalize()}'
+            headers[f'{prefix}-Limit'] = str(limit)
+            headers[f'{prefix}-Remaining'] = str(max(0, limit - used))
+            headers[f'{prefix}-Reset'] = str(reset)
+        if not allowed:
+            headers['Retry-After'] = str(max(reset for _, limit, _, reset, used in windows if used >= limit))
+        return allowed, headers
+
+    def _content(self, route: _Route, url_params: Dict[str, Any], params: Mapping[str, str], body: Any) -> Any:
+        spec = route.spec
+        payload = self.payloads.get(spec.method_name)
+        if payload is not None:
+            return payload(url_params, params, body)
+
+        name = _blog_name(str(url_params.get('blog_identifier', 'fake-user')))
+        pagination = spec.pagination
+        if pagination is not None:
+            items_key = pagination['items']
+            start = min(_page_start(pagination, name, params), self.posts_per_blog)
+            limit = min(max(1, _int_param(params, 'limit', _PAGE_LIMIT)), _PAGE_LIMIT)
+            content = {
+                items_key: [_item(items_key, name, i) for i in range(start, min(start + limit, self.posts_per_blog))],
+                _TOTAL_KEYS.get(items_key, f'total_{items_key}'): self.posts_per_blog,
+            }
+            if 'blog_identifier' in url_params and items_key == 'posts':
+                content['blog'] = _blog(name, self.posts_per_blog)
+            return content
+
+        if spec.http_method != 'GET':
+            post_id = url_params.get('post_id') or (body.get('id') if isinstance(body, dict) else None)
+            if spec.endpoint.endswith('/posts') or post_id is not None:
+                # New posts get an ID above the existing ones
+                return {'id': str(post_id or _post_id(name, 0) + random.randint(1, 1000000)), 'state': 'published'}
+            return {}
+
+        if 'post_id' in url_params:
+            post = _post(name, 0)
+            post.update(id=url_params['post_id'], id_string=str(url_params['post_id']))
+            return post
+        if spec.endpoint.endswith('/info'):
+            if 'blog_identifier' in url_params:
+                return {'blog': _blog(name, self.posts_per_blog)}
+            return {'user': {'name': name, 'likes': self.posts_per_blog // 2, 'following': 10,
+                             'default_post_format': 'html', 'blogs': [_blog(name, self.posts_per_blog)]}}
+        if 'avatar' in spec.endpoint:
+            size = url_params.get('size', 64)
+            return {'avatar_url': f'https://64.media.tumblr.com/avatar_{_seed(name):08x}_{size}.png'}
+        return {}
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        if request.transport is not None and request.transport not in self._transports:
+            self._transports.add(request.transport)
+            self.connections += 1
+
+        route, url_params, path_found = self._resolve(request.method, request.match_info['path'])
+        method_name = route.spec.method_name if route is not None else None
+        self.requests[method_name] += 1
+
+        response = await self._answer(request, route, url_params, path_found)
+        if response is None:
+            # Hang up without a word, as an overloaded load balancer would
+            self.statuses[None] += 1
+            request.transport.close()
+            return web.Response()
+        self.statuses[response.status] += 1
+        return response
+
+    async def _answer(self, request: web.Request, route: Optional[_Route], url_params: Optional[Dict[str, Any]],
+                      path_found: bool) -> Optional[web.Response]:
+        if self.latency is not None:
+            await asyncio.sleep(max(0.0, self.latency()))
+
+        if route is None:
+            if path_found:
+                return self._error(405, f'{request.method} is not supported here.')
+            return self._error(404, 'No such endpoint.')
+
+        form, body = None, None
+        if request.method != 'GET' and request.can_read_body:
+            if request.content_type == 'application/json':
+                try:
+                    body = await request.json()
+                except ValueError:
+                    return self._error(400, 'Invalid JSON body.')
+            else:
+                form = await request.post()
+                body = dict(form)
+
+        consumer_key, rejection = self._check_signature(request, form)
+        if consumer_key is None:
+            return self._error(401, rejection)
+
+        allowed, headers = self._rate_limit(consumer_key)
+        if not allowed:
+            return self._error(429, 'Rate limit exceeded.', headers=headers)
+
+        if self.disconnect_rate and random.random() < self.disconnect_rate:
+            return None
+        for status, probability in self.errors.items():
+            if random.random() < probability:
+                return self._error(status, 'Injected error.', headers=headers)
+
+        missing = [name for name in route.required_params if name not in request.query]
+        missing += [name for name in route.required_body if name not in (body or {})]
+        if missing:
+            return self._error(400, f'Missing required parameters: {", ".join(missing)}.', headers=headers)
+
+        content = self._content(route, url_params, request.query, body)
+        return self._response(201 if request.method == 'POST' else 200, content, headers=headers)
@@ -0,0 +1,89 @@
+# encoding=utf-8
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+__all__ = ['PHASES', 'PhaseStats', 'PhaseTimer', 'call_started', 'current_method_name', 'signing_time']
+
+# Phases of a call of a generated endpoint method, in order:
+# - bind: passing the call arguments on to the generated method, which binds them like any Python function
+# - validate: running the validators of the arguments
+# - prepare: formatting the endpoint and building the query parameters and body, validation excluded
+# - sign: OAuth signing, for all attempts together
+# - request: the rest of `signed_request`: rate limiting, scheduling, retries and the HTTP round trip
+# - parse: reading and decoding the response, when the client parses responses
+PHASES = ('bind', 'validate', 'prepare', 'sign', 'request', 'parse')
+
+# Name of the generated endpoint method making the current request, set by the methods themselves
+current_method_name = ContextVar('aiotumblr_method_name', default=None)  # type: ContextVar[Optional[str]]
+# Clock reading when a timed endpoint method was called, before its arguments got bound
+call_started = ContextVar('aiotumblr_call_started')
+# Seconds spent signing during the current timed call, accumulated in a single-item list
+signing_time = ContextVar('aiotumblr_signing_time', default=None)  # type: ContextVar[Optional[List[float]]]
+
+PhaseHook = Callable[[str, str, float], None]
+
+
+class PhaseStats(object):
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self) -> Dict[str, float]:
+        return {'count': self.count, 'total': self.total, 'mean': self.mean, 'max': self.max}
+
+
+class PhaseTimer(object):
+    """
+    Collects the time spent in each phase (see `PHASES`) of calls of generated endpoint methods, per method.
+
+    Enable it on a client with `TumblrClient(phase_timer=...)` or `TumblrClient.enable_phase_timing`. Timing swaps in
+    instrumented versions of the endpoint methods for that client only, so clients without a timer run exactly the
+    same code as before. Besides keeping statistics, the timer calls its hooks with the method name, the phase and
+    the seconds spent for every measurement, e.g. to feed an external metrics system.
+
+    :param clock: Monotonic clock in seconds
+    :param hooks: Functions called for every measurement
+    """
+    def __init__(self, clock: Callable[[], float] = time.perf_counter, hooks: Optional[List[PhaseHook]] = None):
+        self.clock = clock
+        self.hooks = list(hooks or [])
+        self.stats = {}  # type: Dict[Tuple[str, str], PhaseStats]
+
+    def add_hook(self, hook: PhaseHook):
+        self.hooks.append(hook)
+
+    def record(self, method_name: str, phase: str, seconds: float):
+        key = (method_name, phase)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = PhaseStats()
+        stats.add(seconds)
+
+        for hook in self.hooks:
+            hook(method_name, phase, seconds)
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Statistics per method and phase, phases in call order."""
+        summary = {}  # type: Dict[str, Dict[str, Dict[str, float]]]
+        order = {phase: index for index, phase in enumerate(PHASES)}
+        for (method_name, phase), stats in sorted(self.stats.items(),
+                                                  key=lambda item: (item[0][0], order.get(item[0][1], len(order)))):
+            summary.setdefault(method_name, {})[phase] = stats.to_dict()
+        return summary
+
+    def reset(self):
+        self.stats.clear()
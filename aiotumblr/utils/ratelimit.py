@@ -0,0 +1,329 @@
+# encoding=utf-8
+import asyncio
+import logging
+import random
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+__all__ = ['TokenBucket', 'RateLimiter', 'ConsumerKeyPool']
+
+log = logging.getLogger(__name__)
+
+# Header windows as sent by Tumblr, e.g. `X-Ratelimit-Perhour-Remaining`, with the length of the window in seconds
+_HEADER_WINDOWS = [
+    ('perhour', 3600.0),
+    ('perday', 86400.0),
+]
+
+
+class TokenBucket(object):
+    """
+    Token bucket holding up to `capacity` tokens, refilled continuously at `capacity` tokens per `period` seconds.
+
+    The bucket can be corrected with what the server reports, see `sync`; once the server says the budget is spent,
+    no tokens are handed out until the reported reset time has passed.
+    """
+    def __init__(self, capacity: float, period: float):
+        self.capacity = float(capacity)
+        self.period = float(period)
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0
+        self._updated = None  # type: Optional[float]
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+    def _refill(self, now: float):
+        if self._updated is not None and now > self._updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds to wait until a token is available; 0 if one can be taken right away."""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def sync(self, now: float, limit: Optional[int], remaining: Optional[int], reset: Optional[float]):
+        """Adjust the bucket to the `limit`, `remaining` and `reset` (in seconds) values reported by the server."""
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining <= 0 and reset:
+                self.block(now, reset)
+
+    def block(self, now: float, seconds: float):
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+# Number of tracked accounts above which the buckets of idle accounts are dropped
+_PRUNE_ACCOUNTS_AT = 1024
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+def _sync_buckets(buckets: Dict[str, TokenBucket], now: float, headers: Mapping[str, str]):
+    for window, period in _HEADER_WINDOWS:
+        prefix = f'X-Ratelimit-{window.capitalize()}'
+        limit = _int_header(headers, f'{prefix}-Limit')
+        remaining = _int_header(headers, f'{prefix}-Remaining')
+        reset = _int_header(headers, f'{prefix}-Reset')
+        if limit is None and remaining is None:
+            continue
+        bucket = buckets.get(window)
+        if bucket is None:
+            # The server enforces a budget that wasn't configured; track it anyway
+            bucket = buckets[window] = TokenBucket(limit or remaining or 1, period)
+        bucket.sync(now, limit, remaining, reset)
+
+
+def _retry_after(headers: Mapping[str, str]) -> int:
+    return _int_header(headers, 'Retry-After') or 60
+
+
+class RateLimiter(object):
+    """
+    Client-side rate limiter for `TumblrClient.signed_request`.
+
+    Every request takes a token from the budget of its consumer key and, when signed on behalf of a user, from the
+    budget of that account. Callers wait until a token is available instead of running into 429 responses. Budgets
+    start from the configured values and are corrected with the `X-Ratelimit-*` headers of every response. A single
+    limiter can be shared between clients to enforce a shared budget. Nothing is kept per account unless an account
+    budget is configured, and then only for accounts that haven't got their full budget back yet.
+
+    :param consumer_per_hour: Requests per hour per consumer key, None to disable
+    :param consumer_per_day: Requests per day per consumer key, None to disable
+    :param account_per_hour: Requests per hour per account (resource owner key), None to disable
+    :param account_per_day: Requests per day per account (resource owner key), None to disable
+    """
+    def __init__(self, consumer_per_hour: Optional[int] = 1000, consumer_per_day: Optional[int] = 5000,
+                 account_per_hour: Optional[int] = None, account_per_day: Optional[int] = None):
+        self._consumer_budgets = {'perhour': consumer_per_hour, 'perday': consumer_per_day}
+        self._account_budgets = {'perhour': account_per_hour, 'perday': account_per_day}
+        self._consumer_buckets = {}  # type: Dict[str, Dict[str, TokenBucket]]
+        self._account_buckets = {}  # type: Dict[str, Dict[str, TokenBucket]]
+        self._consumer_locks = {}  # type: Dict[str, asyncio.Lock]
+        # Only held while requests of the account are waiting, as (lock, number of holders and waiters)
+        self._account_locks = {}  # type: Dict[str, List[Any]]
+        # Buckets of accounts that are idle are dropped once this many accounts are tracked, see `_prune_accounts`
+        self._prune_at = _PRUNE_ACCOUNTS_AT
+
+    @staticmethod
+    def _time() -> float:
+        return asyncio.get_running_loop().time()
+
+    @staticmethod
+    def _create_buckets(budgets: Dict[str, Optional[int]]) -> Dict[str, TokenBucket]:
+        return {
+            window: TokenBucket(budgets[window], period)
+            for window, period in _HEADER_WINDOWS if budgets[window]
+        }
+
+    def _consumer(self, consumer_key: str) -> Dict[str, TokenBucket]:
+        try:
+            return self._consumer_buckets[consumer_key]
+        except KeyError:
+            buckets = self._consumer_buckets[consumer_key] = self._create_buckets(self._consumer_budgets)
+            return buckets
+
+    @property
+    def _limits_accounts(self) -> bool:
+        return any(self._account_budgets.values())
+
+    def _account(self, account_key: Optional[str]) -> Dict[str, TokenBucket]:
+        # Without account budgets nothing is tracked per account, so memory doesn't grow with the number of users
+        if account_key is None or not self._limits_accounts:
+            return {}
+        try:
+            return self._account_buckets[account_key]
+        except KeyError:
+            buckets = self._account_buckets[account_key] = self._create_buckets(self._account_budgets)
+            return buckets
+
+    def _prune_accounts(self, now: float):
+        """Drop the buckets of accounts that are back at their full budget, which are the same as new ones."""
+        idle = [
+            account_key for account_key, buckets in self._account_buckets.items()
+            if account_key not in self._account_locks
+            and all(bucket.delay(now) <= 0 and bucket.tokens >= bucket.capacity for bucket in buckets.values())
+        ]
+        for account_key in idle:
+            del self._account_buckets[account_key]
+        self._prune_at = max(_PRUNE_ACCOUNTS_AT, 2 * len(self._account_buckets))
+
+    def _buckets(self, consumer_key: str, account_key: Optional[str]) -> List[TokenBucket]:
+        return [*self._consumer(consumer_key).values(), *self._account(account_key).values()]
+
+    def delay(self, consumer_key: str, account_key: Optional[str] = None) -> float:
+        """Seconds until a request for this consumer key and account could be made, without taking a token."""
+        now = self._time()
+        return max([bucket.delay(now) for bucket in self._buckets(consumer_key, account_key)], default=0.0)
+
+    async def acquire(self, consumer_key: str, account_key: Optional[str] = None):
+        """Wait until both the consumer key and the account have budget left, and take one token from each."""
+        if account_key is None or not self._limits_accounts:
+            await self._acquire(consumer_key, None)
+            return
+
+        # Requests of the same account queue up first, so one account running out of budget doesn't hold up the
+        # requests of other accounts waiting for the consumer key
+        entry = self._account_locks.get(account_key)
+        if entry is None:
+            entry = self._account_locks[account_key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                buckets = list(self._account(account_key).values())
+                while True:
+                    wait = max([bucket.delay(self._time()) for bucket in buckets], default=0.0)
+                    if wait <= 0:
+                        break
+                    log.debug(f'Rate limit reached for account {account_key!r}, waiting {wait:.2f}s')
+                    await asyncio.sleep(wait)
+                await self._acquire(consumer_key, account_key)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._account_locks[account_key]
+
+        if len(self._account_buckets) > self._prune_at:
+            self._prune_accounts(self._time())
+
+    async def _acquire(self, consumer_key: str, account_key: Optional[str]):
+        lock = self._consumer_locks.get(consumer_key)
+        if lock is None:
+            lock = self._consumer_locks[consumer_key] = asyncio.Lock()
+
+        # The lock keeps waiters for the budget of a consumer key in FIFO order, whichever account they are for
+        async with lock:
+            buckets = self._buckets(consumer_key, account_key)
+            while True:
+                now = self._time()
+                wait = max([bucket.delay(now) for bucket in buckets], default=0.0)
+                if wait <= 0:
+                    for bucket in buckets:
+                        bucket.take(now)
+                    return
+                log.debug(f'Rate limit reached for consumer {consumer_key!r}, waiting {wait:.2f}s')
+                await asyncio.sleep(wait)
+
+    def update(self, consumer_key: str, account_key: Optional[str], status: int, headers: Mapping[str, str]):
+        """Correct the budgets with the rate limit headers (and status) of a response."""
+        now = self._time()
+        _sync_buckets(self._consumer(consumer_key), now, headers)
+
+        if status == 429:
+            retry_after = _retry_after(headers)
+            for bucket in self._buckets(consumer_key, account_key):
+                bucket.block(now, retry_after)
+
+
+class ConsumerKeyPool(object):
+    """
+    Set of consumer key/secret pairs (i.e. registered applications) to spread requests without user credentials over.
+
+    Each request picks a key at random, weighted by how much of its budget is left, so the keys drain at about the
+    same rate. Budgets start from the configured values and are corrected with the `X-Ratelimit-*` headers of every
+    response; a key that is spent or got a 429 response is left out until its window resets. When all keys are spent,
+    callers wait for the first one to become available again.
+
+    :param credentials: Consumer key and secret pairs
+    :param per_hour: Requests per hour per consumer key, None to disable
+    :param per_day: Requests per day per consumer key, None to disable
+    """
+    def __init__(self, credentials: Iterable[Tuple[str, str]], per_hour: Optional[int] = 1000,
+                 per_day: Optional[int] = 5000):
+        self._secrets = dict(credentials)  # type: Dict[str, str]
+        if not self._secrets:
+            raise ValueError('At least one consumer key is required.')
+
+        budgets = {'perhour': per_hour, 'perday': per_day}
+        self._buckets = {
+            key: {window: TokenBucket(budgets[window], period) for window, period in _HEADER_WINDOWS if budgets[window]}
+            for key in self._secrets
+        }  # type: Dict[str, Dict[str, TokenBucket]]
+
+    def __len__(self) -> int:
+        return len(self._secrets)
+
+    @property
+    def keys(self) -> List[str]:
+        return list(self._secrets)
+
+    def secret(self, consumer_key: str) -> str:
+        return self._secrets[consumer_key]
+
+    @staticmethod
+    def _time() -> float:
+        return asyncio.get_running_loop().time()
+
+    def remaining(self, consumer_key: str) -> float:
+        """Requests left for `consumer_key` in its tightest window; infinite if no budget applies."""
+        now = self._time()
+        buckets = self._buckets[consumer_key].values()
+        for bucket in buckets:
+            bucket.delay(now)  # Refill
+        return min([bucket.tokens for bucket in buckets], default=float('inf'))
+
+    def available(self) -> List[str]:
+        """Consumer keys that can make a request right now."""
+        now = self._time()
+        return [
+            key for key, buckets in self._buckets.items()
+            if all(bucket.delay(now) <= 0 for bucket in buckets.values())
+        ]
+
+    async def acquire(self) -> str:
+        """Wait until a consumer key has budget left, take one token from it and return the key."""
+        while True:
+            now = self._time()
+            available, weights, wait = [], [], float('inf')
+            for key, buckets in self._buckets.items():
+                delay = max([bucket.delay(now) for bucket in buckets.values()], default=0.0)
+                if delay <= 0:
+                    available.append(key)
+                    weights.append(min([bucket.tokens for bucket in buckets.values()], default=None))
+                else:
+                    wait = min(wait, delay)
+
+            if available:
+                # Keys whose budget isn't known yet weigh as much as the best known one, so they get to report it
+                default = max([weight for weight in weights if weight is not None], default=1.0)
+                weights = [default if weight is None else max(weight, 1.0) for weight in weights]
+                key = available[0] if len(available) == 1 else random.choices(available, weights)[0]
+                for bucket in self._buckets[key].values():
+                    bucket.take(now)
+                return key
+
+            log.debug(f'All {len(self._buckets)} consumer keys are out of budget, waiting {wait:.2f}s')
+            await asyncio.sleep(wait)
+
+    def update(self, consumer_key: str, status: int, headers: Mapping[str, str]):
+        """Correct the budget of `consumer_key` with the rate limit headers (and status) of a response."""
+        now = self._time()
+        buckets = self._buckets[consumer_key]
+        _sync_buckets(buckets, now, headers)
+
+        if status == 429:
+            retry_after = _retry_after(headers)
+            for bucket in buckets.values():
+                bucket.block(now, retry_after)
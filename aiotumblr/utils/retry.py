@@ -0,0 +1,79 @@
+# encoding=utf-8
+import asyncio
+import random
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Collection, Mapping, Optional
+
+import aiohttp
+
+__all__ = ['RetryPolicy']
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy(object):
+    """
+    Retry policy for `TumblrClient.signed_request`.
+
+    Requests that fail with a connection error, a timeout or one of `statuses` are attempted again, up to
+    `max_attempts` attempts in total. Only idempotent HTTP methods are retried, unless `retry_non_idempotent` is set;
+    the write endpoints of Tumblr (e.g. `create_post`, `like_post`) are all POST requests and thus left alone by
+    default. Between attempts the policy waits for the `Retry-After` header if the server sent one, and otherwise for
+    a random delay between 0 and `backoff_base * 2 ** (attempt - 1)` seconds after failed attempt number `attempt`,
+    capped at `backoff_max` ("full jitter"); the first retry thus waits up to `backoff_base`.
+
+    :param max_attempts: Total number of attempts, including the first one
+    :param backoff_base: Base of the exponential backoff in seconds
+    :param backoff_max: Maximum delay between two attempts in seconds
+    :param statuses: HTTP statuses that are worth retrying
+    :param retry_non_idempotent: Retry POST and PATCH requests as well
+    :param respect_retry_after: Honour `Retry-After` headers (still capped at `backoff_max`)
+    """
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 statuses: Collection[int] = RETRY_STATUSES, retry_non_idempotent: bool = False,
+                 respect_retry_after: bool = True):
+        if max_attempts < 1:
+            raise ValueError('max_attempts should be at least 1.')
+
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.statuses = frozenset(statuses)
+        self.retry_non_idempotent = retry_non_idempotent
+        self.respect_retry_after = respect_retry_after
+
+    def allows(self, method: str) -> bool:
+        return self.retry_non_idempotent or method.upper() in IDEMPOTENT_METHODS
+
+    def should_retry_status(self, status: int) -> bool:
+        return status in self.statuses
+
+    @staticmethod
+    def should_retry_exception(exc: BaseException) -> bool:
+        return isinstance(exc, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+    def delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """Seconds to wait after failed attempt number `attempt` (starting at 1)."""
+        if self.respect_retry_after and headers is not None:
+            retry_after = _parse_retry_after(headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
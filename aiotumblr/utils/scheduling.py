@@ -0,0 +1,150 @@
+# encoding=utf-8
+import asyncio
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, Mapping, Optional
+
+__all__ = ['PRIORITY_HIGH', 'PRIORITY_NORMAL', 'PRIORITY_LOW', 'request_priority', 'RequestScheduler']
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+DEFAULT_WEIGHTS = {
+    PRIORITY_HIGH: 16,
+    PRIORITY_NORMAL: 4,
+    PRIORITY_LOW: 1,
+}
+
+# Priority of the requests made from the current context; see `TumblrClient.priority`
+request_priority = ContextVar('aiotumblr_request_priority', default=PRIORITY_NORMAL)
+
+
+class _Slot(object):
+    __slots__ = ('scheduler', 'priority')
+
+    def __init__(self, scheduler: 'RequestScheduler', priority: int):
+        self.scheduler = scheduler
+        self.priority = priority
+
+    async def __aenter__(self):
+        await self.scheduler.acquire(self.priority)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.scheduler.release(self.priority)
+
+
+class RequestScheduler(object):
+    """
+    Concurrency budget for `TumblrClient.signed_request`, shared fairly between priority classes.
+
+    At most `concurrency` requests are in flight at the same time; further requests wait in the queue of their
+    priority class. Free slots go to the waiting classes in proportion to their `weights` (stride scheduling), so
+    high-priority requests overtake a long backlog of low-priority ones, while the latter still get a share of the
+    slots and never starve. `PRIORITY_LOW` requests never hold more than `concurrency - reserved` slots, leaving
+    headroom for interactive calls to start right away even while a crawl saturates the rest. A single scheduler can
+    be shared between clients to enforce a common budget.
+
+    :param concurrency: Maximum number of requests in flight
+    :param weights: Share of the free slots per priority class; lower priority numbers are more urgent
+    :param reserved: Slots `PRIORITY_LOW` requests can't take, kept for more urgent ones; defaults to a quarter of
+        `concurrency`
+    """
+    def __init__(self, concurrency: int = 16, weights: Optional[Mapping[int, float]] = None,
+                 reserved: Optional[int] = None):
+        if concurrency < 1:
+            raise ValueError('concurrency should be at least 1.')
+        if reserved is None:
+            reserved = concurrency // 4
+        if not 0 <= reserved < concurrency:
+            raise ValueError('reserved should be at least 0 and smaller than concurrency.')
+
+        weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        if any(weight <= 0 for weight in weights.values()):
+            raise ValueError('weights should be positive.')
+
+        self.concurrency = concurrency
+        self.reserved = reserved
+        self.weights = weights
+        self.active = 0
+        # Requests in flight per priority class
+        self._active = {priority: 0 for priority in weights}  # type: Dict[int, int]
+
+        self._waiters = {priority: deque() for priority in weights}  # type: Dict[int, Deque[asyncio.Future]]
+        # Stride scheduling: the waiting class with the lowest pass goes next, and its pass advances by 1 / weight
+        self._pass = {priority: 0.0 for priority in weights}  # type: Dict[int, float]
+        self._virtual_time = 0.0
+
+    def slot(self, priority: int) -> _Slot:
+        """Async context manager holding a slot for a request of `priority` while its block runs."""
+        return _Slot(self, priority)
+
+    def waiting(self, priority: Optional[int] = None) -> int:
+        """Number of requests waiting for a slot, of one priority class or in total."""
+        queues = self._waiters.values() if priority is None else [self._waiters[priority]]
+        return sum(sum(1 for waiter in queue if not waiter.done()) for queue in queues)
+
+    def _check_priority(self, priority: int):
+        if priority not in self.weights:
+            raise ValueError(f'Unknown priority {priority!r}, expected one of {sorted(self.weights)}.')
+
+    def _can_start(self, priority: int) -> bool:
+        if self.active >= self.concurrency:
+            return False
+        if priority < PRIORITY_LOW:
+            return True
+        # The reserve caps the slots held by low-priority requests, not the total; capping the total would shut them
+        # out for good as soon as more urgent requests keep the scheduler busy
+        low = sum(active for p, active in self._active.items() if p >= PRIORITY_LOW)
+        return low < self.concurrency - self.reserved
+
+    def _grant(self, priority: int):
+        self.active += 1
+        self._active[priority] += 1
+        self._virtual_time = self._pass[priority]
+        self._pass[priority] += 1.0 / self.weights[priority]
+
+    def _dispatch(self):
+        while self.active < self.concurrency:
+            candidates = []
+            for priority, queue in self._waiters.items():
+                while queue and queue[0].done():
+                    # Cancelled while waiting
+                    queue.popleft()
+                if queue and self._can_start(priority):
+                    candidates.append(priority)
+            if not candidates:
+                return
+
+            priority = min(candidates, key=lambda p: (self._pass[p], p))
+            self._grant(priority)
+            self._waiters[priority].popleft().set_result(None)
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL):
+        """Wait for a free slot for a request of `priority`, and take it."""
+        self._check_priority(priority)
+        queue = self._waiters[priority]
+        if not queue:
+            # A class that was idle doesn't get to catch up on the slots it didn't use
+            self._pass[priority] = max(self._pass[priority], self._virtual_time)
+            if self._can_start(priority) and self.waiting() == 0:
+                self._grant(priority)
+                return
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted, but cancelled before it could be used
+                self.release(priority)
+            raise
+
+    def release(self, priority: int = PRIORITY_NORMAL):
+        """Give back a slot taken by `acquire` for a request of `priority`."""
+        self.active -= 1
+        self._active[priority] -= 1
+        self._dispatch()
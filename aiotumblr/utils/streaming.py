@@ -0,0 +1,144 @@
+# encoding=utf-8
+import json
+import re
+from typing import List, Optional, Sequence, Tuple
+
+__all__ = ['JSONItemScanner']
+
+_STRUCTURAL = re.compile(rb'["{}\[\],:]')
+_WHITESPACE = b' \t\r\n'
+
+
+class _Container(object):
+    __slots__ = ('is_object', 'key', 'expect_key')
+
+    def __init__(self, is_object: bool):
+        self.is_object = is_object
+        self.key = None  # type: Optional[str]
+        self.expect_key = is_object
+
+
+class JSONItemScanner(object):
+    """
+    Incremental scanner that cuts the items of one array out of a JSON document while it is being received.
+
+    Only structural characters and strings are looked at, the items themselves are returned as raw bytes so they can be
+    decoded by whichever JSON decoder the client uses. Bytes that are not part of a pending item or value are discarded
+    as soon as they have been scanned, keeping memory bounded by the size of the largest single item.
+
+    :param items_path: Keys leading to the array whose items should be returned, e.g. `('response', 'posts')`
+    :param value_paths: Keys of other (small) values to return as a whole, e.g. `[('meta',)]`
+    """
+    def __init__(self, items_path: Tuple[str, ...] = ('response', 'posts'),
+                 value_paths: Sequence[Tuple[str, ...]] = (('meta',),)):
+        self.items_path = tuple(items_path)
+        self.value_paths = {tuple(path) for path in value_paths}
+        self._max_depth = max([len(self.items_path)] + [len(path) for path in self.value_paths])
+
+        self._buf = bytearray()
+        self._pos = 0
+        self._stack = []  # type: List[_Container]
+        self._items_depth = None  # type: Optional[int]
+        self._item_start = None  # type: Optional[int]
+        self._value_path = None  # type: Optional[Tuple[str, ...]]
+        self._value_depth = None  # type: Optional[int]
+        self._value_start = None  # type: Optional[int]
+
+    def _path(self) -> Optional[Tuple[str, ...]]:
+        if len(self._stack) > self._max_depth or not all(c.is_object for c in self._stack):
+            return None
+        return tuple(c.key for c in self._stack)
+
+    def _emit_item(self, end: int, found: List[Tuple[str, bytes]]):
+        raw = bytes(self._buf[self._item_start:end]).strip(_WHITESPACE)
+        if raw:
+            found.append(('item', raw))
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, bytes]]:
+        """
+        Scan the next chunk of the document.
+
+        :return: list of `('item', raw_item)` and `(dotted_value_path, raw_value)` tuples completed by this chunk
+        """
+        buf = self._buf
+        buf += chunk
+        stack = self._stack
+        found = []
+        pos = self._pos
+
+        while True:
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+
+            idx = match.start()
+            char = buf[idx]
+
+            if char == 0x22:  # "
+                end = buf.find(b'"', idx + 1)
+                while end != -1:
+                    backslashes = 0
+                    while buf[end - 1 - backslashes] == 0x5c:
+                        backslashes += 1
+                    if backslashes % 2 == 0:
+                        break
+                    end = buf.find(b'"', end + 1)
+
+                if end == -1:
+                    # String continues in the next chunk
+                    pos = idx
+                    break
+
+                top = stack[-1] if stack else None
+                if top is not None and top.is_object and top.expect_key:
+                    raw_key = bytes(buf[idx + 1:end])
+                    top.key = json.loads(buf[idx:end + 1]) if b'\\' in raw_key else raw_key.decode('utf-8')
+                pos = end + 1
+                continue
+
+            pos = idx + 1
+            depth = len(stack)
+
+            if char == 0x7b or char == 0x5b:  # { [
+                if char == 0x5b and self._items_depth is None and self._path() == self.items_path:
+                    self._items_depth = depth + 1
+                    self._item_start = pos
+                stack.append(_Container(is_object=char == 0x7b))
+            elif char == 0x3a:  # :
+                top = stack[-1]
+                top.expect_key = False
+                if self._value_start is None and self._items_depth is None:
+                    path = self._path()
+                    if path in self.value_paths:
+                        self._value_path = path
+                        self._value_depth = depth
+                        self._value_start = pos
+            elif char == 0x2c or char == 0x7d or char == 0x5d:  # , } ]
+                if depth == self._items_depth:
+                    self._emit_item(idx, found)
+                    self._item_start = pos
+                if depth == self._value_depth:
+                    found.append(('.'.join(self._value_path), bytes(buf[self._value_start:idx]).strip(_WHITESPACE)))
+                    self._value_path = self._value_depth = self._value_start = None
+
+                if char == 0x2c:
+                    if stack[-1].is_object:
+                        stack[-1].expect_key = True
+                else:
+                    if depth == self._items_depth:
+                        self._items_depth = self._item_start = None
+                    stack.pop()
+
+        # Drop everything that has been scanned and is not part of a pending item or value
+        keep_from = min(p for p in (pos, self._item_start, self._value_start) if p is not None)
+        if keep_from:
+            del buf[:keep_from]
+            pos -= keep_from
+            if self._item_start is not None:
+                self._item_start -= keep_from
+            if self._value_start is not None:
+                self._value_start -= keep_from
+        self._pos = pos
+
+        return found
@@ -1,8 +1,15 @@
+import asyncio
+import bisect
 import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from aiohttp.tracing import TraceConfig, TraceRequestStartParams, TraceRequestEndParams, TraceRequestRedirectParams
+from aiohttp.tracing import TraceConfig, TraceRequestStartParams, TraceRequestEndParams, TraceRequestRedirectParams, \
+    TraceRequestExceptionParams, TraceRequestChunkSentParams, TraceResponseChunkReceivedParams
 
-__all__ = ['AIOTumblrDebugger']
+from aiotumblr.utils.phases import current_method_name
+
+__all__ = ['AIOTumblrDebugger', 'AIOTumblrMetrics', 'Histogram', 'current_method_name']
 
 
 class AIOTumblrDebugger(TraceConfig):
@@ -26,3 +33,267 @@ class AIOTumblrDebugger(TraceConfig):
     async def _on_request_redirection_handler(self, session, ctx, params: TraceRequestRedirectParams):
         self._log.debug(f'Redirecting to {params.method} {params.url.human_repr()}')
         self._log.debug(f'With headers: {params.headers}')
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram(object):
+    """Cumulative histogram of durations in seconds, in the shape Prometheus expects."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+
+    def cumulative_counts(self) -> List[Tuple[float, int]]:
+        total, result = 0, []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        result.append((float('inf'), self.count))
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'buckets': self.cumulative_counts(), 'sum': self.sum, 'count': self.count}
+
+
+class MethodMetrics(object):
+    """Metrics of the requests made by one endpoint method."""
+    __slots__ = ('latency', 'response_time', 'statuses', 'exceptions', 'bytes_sent', 'bytes_received')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.latency = Histogram(buckets)
+        self.response_time = Histogram(buckets)
+        self.statuses = Counter()  # type: Counter[int]
+        self.exceptions = Counter()  # type: Counter[str]
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'latency': self.latency.to_dict(),
+            'response_time': self.response_time.to_dict(),
+            'statuses': dict(self.statuses),
+            'exceptions': dict(self.exceptions),
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+        }
+
+
+def _label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+class AIOTumblrMetrics(TraceConfig):
+    """
+    Trace config collecting request metrics, per endpoint method and for the connection pool.
+
+    Per generated method (e.g. `get_blog_posts`; requests made with `signed_request` directly are filed under
+    `unknown_method`) it records histograms of the latency up to the response headers, overall and from the moment a
+    connection was available (the response time of the server), status counts, exceptions and the bytes sent and
+    received. For the pool, it records how long requests waited for a free connection, how long DNS lookups and new
+    connections took, and how many requests reused a connection. Comparing these tells apart a slow API (response
+    time), an exhausted pool (queue wait), slow networking (DNS and connect) and a busy event loop (latency well above
+    the sum of the others).
+
+    Pass it to `TumblrClient` with `trace_configs`; read the metrics with `snapshot` or `prometheus`.
+
+    :param buckets: Upper bounds in seconds of the histogram buckets
+    :param prefix: Prefix of the metric names in the Prometheus output
+    """
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, prefix: str = 'aiotumblr'):
+        super().__init__()
+
+        self._buckets = tuple(buckets)
+        self.prefix = prefix
+        self.reset()
+
+        self.on_request_start.append(self._on_request_start_handler)
+        self.on_request_end.append(self._on_request_end_handler)
+        self.on_request_exception.append(self._on_request_exception_handler)
+        self.on_request_chunk_sent.append(self._on_request_chunk_sent_handler)
+        self.on_response_chunk_received.append(self._on_response_chunk_received_handler)
+        self.on_connection_queued_start.append(self._on_connection_queued_start_handler)
+        self.on_connection_queued_end.append(self._on_connection_queued_end_handler)
+        self.on_connection_create_start.append(self._on_connection_create_start_handler)
+        self.on_connection_create_end.append(self._on_connection_create_end_handler)
+        self.on_connection_reuseconn.append(self._on_connection_reuseconn_handler)
+        self.on_dns_resolvehost_start.append(self._on_dns_resolvehost_start_handler)
+        self.on_dns_resolvehost_end.append(self._on_dns_resolvehost_end_handler)
+        self.on_dns_cache_hit.append(self._on_dns_cache_hit_handler)
+        self.on_dns_cache_miss.append(self._on_dns_cache_miss_handler)
+
+    def reset(self):
+        self.methods = {}  # type: Dict[str, MethodMetrics]
+        self.queue_wait = Histogram(self._buckets)
+        self.connect = Histogram(self._buckets)
+        self.dns = Histogram(self._buckets)
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    @property
+    def connection_reuse_ratio(self) -> Optional[float]:
+        """Share of requests sent over an already open connection; None before the first request."""
+        total = self.connections_created + self.connections_reused
+        return self.connections_reused / total if total else None
+
+    @staticmethod
+    def _time() -> float:
+        return asyncio.get_running_loop().time()
+
+    def _method(self, ctx) -> MethodMetrics:
+        request_ctx = ctx.trace_request_ctx
+        name = getattr(request_ctx, 'method_name', None) or 'unknown_method'
+        try:
+            return self.methods[name]
+        except KeyError:
+            metrics = self.methods[name] = MethodMetrics(self._buckets)
+            return metrics
+
+    async def _on_request_start_handler(self, session, ctx, params: TraceRequestStartParams):
+        ctx.request_start = self._time()
+
+    async def _on_request_end_handler(self, session, ctx, params: TraceRequestEndParams):
+        metrics = self._method(ctx)
+        now = self._time()
+        metrics.latency.observe(now - ctx.request_start)
+        connected = getattr(ctx, 'connected', None)
+        if connected is not None:
+            metrics.response_time.observe(now - connected)
+        metrics.statuses[params.response.status] += 1
+
+    async def _on_request_exception_handler(self, session, ctx, params: TraceRequestExceptionParams):
+        metrics = self._method(ctx)
+        metrics.latency.observe(self._time() - ctx.request_start)
+        metrics.exceptions[type(params.exception).__name__] += 1
+
+    async def _on_request_chunk_sent_handler(self, session, ctx, params: TraceRequestChunkSentParams):
+        self._method(ctx).bytes_sent += len(params.chunk)
+
+    async def _on_response_chunk_received_handler(self, session, ctx, params: TraceResponseChunkReceivedParams):
+        self._method(ctx).bytes_received += len(params.chunk)
+
+    async def _on_connection_queued_start_handler(self, session, ctx, params):
+        ctx.queued_start = self._time()
+
+    async def _on_connection_queued_end_handler(self, session, ctx, params):
+        self.queue_wait.observe(self._time() - ctx.queued_start)
+
+    async def _on_connection_create_start_handler(self, session, ctx, params):
+        ctx.connect_start = self._time()
+
+    async def _on_connection_create_end_handler(self, session, ctx, params):
+        ctx.connected = self._time()
+        self.connect.observe(ctx.connected - ctx.connect_start)
+        self.connections_created += 1
+
+    async def _on_connection_reuseconn_handler(self, session, ctx, params):
+        ctx.connected = self._time()
+        self.connections_reused += 1
+
+    async def _on_dns_resolvehost_start_handler(self, session, ctx, params):
+        ctx.dns_start = self._time()
+
+    async def _on_dns_resolvehost_end_handler(self, session, ctx, params):
+        self.dns.observe(self._time() - ctx.dns_start)
+
+    async def _on_dns_cache_hit_handler(self, session, ctx, params):
+        self.dns_cache_hits += 1
+
+    async def _on_dns_cache_miss_handler(self, session, ctx, params):
+        self.dns_cache_misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as plain data."""
+        return {
+            'methods': {name: metrics.to_dict() for name, metrics in self.methods.items()},
+            'pool': {
+                'queue_wait': self.queue_wait.to_dict(),
+                'connect': self.connect.to_dict(),
+                'dns': self.dns.to_dict(),
+                'connections_created': self.connections_created,
+                'connections_reused': self.connections_reused,
+                'connection_reuse_ratio': self.connection_reuse_ratio,
+                'dns_cache_hits': self.dns_cache_hits,
+                'dns_cache_misses': self.dns_cache_misses,
+            },
+        }
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def header(name: str, kind: str, description: str):
+            lines.append(f'# HELP {self.prefix}_{name} {description}')
+            lines.append(f'# TYPE {self.prefix}_{name} {kind}')
+
+        def histogram(name: str, histogram: Histogram, labels: str = ''):
+            separator = ',' if labels else ''
+            for bound, count in histogram.cumulative_counts():
+                lines.append(f'{self.prefix}_{name}_bucket{{{labels}{separator}le="{_format_bound(bound)}"}} {count}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f'{self.prefix}_{name}_sum{suffix} {histogram.sum!r}')
+            lines.append(f'{self.prefix}_{name}_count{suffix} {histogram.count}')
+
+        methods = sorted(self.methods.items())
+
+        header('request_duration_seconds', 'histogram', 'Time until the response headers were received.')
+        for name, metrics in methods:
+            histogram('request_duration_seconds', metrics.latency, f'method="{_label(name)}"')
+
+        header('response_time_seconds', 'histogram',
+               'Time from having a connection until the response headers were received.')
+        for name, metrics in methods:
+            histogram('response_time_seconds', metrics.response_time, f'method="{_label(name)}"')
+
+        header('responses_total', 'counter', 'Responses by HTTP status.')
+        for name, metrics in methods:
+            for status, count in sorted(metrics.statuses.items()):
+                lines.append(f'{self.prefix}_responses_total{{method="{_label(name)}",status="{status}"}} {count}')
+
+        header('request_exceptions_total', 'counter', 'Requests that failed without a response.')
+        for name, metrics in methods:
+            for exception, count in sorted(metrics.exceptions.items()):
+                lines.append(f'{self.prefix}_request_exceptions_total'
+                             f'{{method="{_label(name)}",exception="{_label(exception)}"}} {count}')
+
+        header('request_bytes_total', 'counter', 'Bytes of request bodies sent.')
+        for name, metrics in methods:
+            lines.append(f'{self.prefix}_request_bytes_total{{method="{_label(name)}"}} {metrics.bytes_sent}')
+
+        header('response_bytes_total', 'counter', 'Bytes of response bodies received.')
+        for name, metrics in methods:
+            lines.append(f'{self.prefix}_response_bytes_total{{method="{_label(name)}"}} {metrics.bytes_received}')
+
+        header('connection_queue_duration_seconds', 'histogram', 'Time spent waiting for a free connection.')
+        histogram('connection_queue_duration_seconds', self.queue_wait)
+        header('connection_create_duration_seconds', 'histogram', 'Time spent opening new connections.')
+        histogram('connection_create_duration_seconds', self.connect)
+        header('dns_resolve_duration_seconds', 'histogram', 'Time spent resolving host names.')
+        histogram('dns_resolve_duration_seconds', self.dns)
+
+        header('connections_total', 'counter', 'Connections used by requests, new or reused.')
+        lines.append(f'{self.prefix}_connections_total{{state="new"}} {self.connections_created}')
+        lines.append(f'{self.prefix}_connections_total{{state="reused"}} {self.connections_reused}')
+
+        header('dns_cache_total', 'counter', 'DNS cache lookups.')
+        lines.append(f'{self.prefix}_dns_cache_total{{result="hit"}} {self.dns_cache_hits}')
+        lines.append(f'{self.prefix}_dns_cache_total{{result="miss"}} {self.dns_cache_misses}')
+
+        return '\n'.join(lines) + '\n'
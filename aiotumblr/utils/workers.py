@@ -0,0 +1,228 @@
+# encoding=utf-8
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from aiotumblr.core import TumblrClient
+from aiotumblr.utils.crawling import crawl_blog_posts
+from aiotumblr.utils.ratelimit import RateLimiter
+
+__all__ = ['CrawlRecord', 'ProcessCrawlRunner']
+
+log = logging.getLogger(__name__)
+
+# Messages from the workers to the parent: (kind, blog identifier, payload)
+_ITEM = 'item'
+_ERROR = 'error'
+_EXIT = 'exit'
+
+# How often blocked queue operations in the parent check whether the run was aborted, in seconds
+_POLL_INTERVAL = 0.1
+
+
+class CrawlRecord(object):
+    """
+    One result of a `ProcessCrawlRunner` run: either an `item` crawled from the blog, or the `error` that ended the
+    crawl of the blog, as a string since exceptions don't always survive the trip between processes.
+    """
+    __slots__ = ('blog_identifier', 'item', 'error')
+
+    def __init__(self, blog_identifier: str, item: Any = None, error: Optional[str] = None):
+        self.blog_identifier = blog_identifier
+        self.item = item
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        outcome = f'item={self.item!r}' if self.ok else f'error={self.error!r}'
+        return f'<CrawlRecord blog_identifier={self.blog_identifier!r} {outcome}>'
+
+
+async def _put(results: multiprocessing.Queue, message):
+    try:
+        results.put_nowait(message)
+    except queue.Full:
+        # The parent is behind; wait for room without blocking the loop
+        await asyncio.get_running_loop().run_in_executor(None, results.put, message)
+
+
+async def _crawl_blog(client, blog_identifier: str, results: multiprocessing.Queue,
+                      process_post: Optional[Callable[[str, Dict[str, Any]], Any]], crawl_options: Dict[str, Any]):
+    async for post in crawl_blog_posts(client, blog_identifier, **crawl_options):
+        item = post if process_post is None else process_post(blog_identifier, post)
+        if item is not None:
+            await _put(results, (_ITEM, blog_identifier, item))
+
+
+async def _worker_main(client_args: tuple, client_kwargs: Dict[str, Any], tasks: multiprocessing.Queue,
+                       results: multiprocessing.Queue, concurrency: int,
+                       process_post: Optional[Callable[[str, Dict[str, Any]], Any]], crawl_options: Dict[str, Any]):
+    loop = asyncio.get_running_loop()
+    client = TumblrClient(*client_args, **client_kwargs)
+    local_tasks = asyncio.Queue(maxsize=concurrency)
+
+    async def read_tasks():
+        while True:
+            blog_identifier = await loop.run_in_executor(None, tasks.get)
+            if blog_identifier is None:
+                break
+            await local_tasks.put(blog_identifier)
+        for _ in range(concurrency):
+            await local_tasks.put(None)
+
+    async def crawl():
+        while True:
+            blog_identifier = await local_tasks.get()
+            if blog_identifier is None:
+                return
+            try:
+                await _crawl_blog(client, blog_identifier, results, process_post, crawl_options)
+            except Exception as e:
+                log.debug(f'Crawling {blog_identifier!r} failed: {e!r}')
+                await _put(results, (_ERROR, blog_identifier, repr(e)))
+
+    try:
+        await asyncio.gather(read_tasks(), *(crawl() for _ in range(concurrency)))
+    finally:
+        await client.close_connection()
+
+
+def _worker(client_args: tuple, client_kwargs: Dict[str, Any], tasks: multiprocessing.Queue,
+            results: multiprocessing.Queue, concurrency: int,
+            process_post: Optional[Callable[[str, Dict[str, Any]], Any]], crawl_options: Dict[str, Any]):
+    try:
+        asyncio.run(_worker_main(client_args, client_kwargs, tasks, results, concurrency, process_post,
+                                 crawl_options))
+    finally:
+        results.put((_EXIT, None, None))
+
+
+class ProcessCrawlRunner(object):
+    """
+    Crawl the posts of many blogs with a pool of worker processes, to use more than one CPU core for decoding and
+    signing.
+
+    Blog identifiers are handed out to the workers through a bounded queue as they become free, and every worker runs
+    its own event loop and `TumblrClient` crawling `concurrency` blogs at a time with `crawl_blog_posts`. The rate
+    limit budget of the consumer key is split evenly between the workers. Results stream back to the parent through a
+    bounded queue of `queue_size` records, so slow consumers hold the workers back instead of piling up memory.
+
+    `process_post` runs in the workers on every crawled post, with the blog identifier and the post; its return value
+    is sent to the parent instead of the post, or nothing when it returns None. Use it to move per-post work (e.g.
+    picking the fields of interest) to the workers. It, and the client arguments, need to be picklable, so
+    module-level functions only.
+
+    :param client_args: Positional arguments for `TumblrClient`, e.g. the consumer key and secret
+    :param client_kwargs: Keyword arguments for `TumblrClient`; `parse_responses` is left to the crawler
+    :param processes: Number of worker processes; defaults to the number of CPU cores
+    :param concurrency: Blogs crawled at the same time per worker
+    :param queue_size: Maximum number of records waiting for the parent
+    :param per_hour: Requests per hour of the consumer key, shared by all workers; None to disable
+    :param per_day: Requests per day of the consumer key, shared by all workers; None to disable
+    :param process_post: Function applied to every post in the workers
+    :param crawl_options: Further arguments for `crawl_blog_posts`, e.g. `concurrency` or `reblog_info`
+    """
+    def __init__(self, client_args: tuple, client_kwargs: Optional[Dict[str, Any]] = None,
+                 processes: Optional[int] = None, concurrency: int = 8, queue_size: int = 1024,
+                 per_hour: Optional[int] = 1000, per_day: Optional[int] = 5000,
+                 process_post: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
+                 crawl_options: Optional[Dict[str, Any]] = None):
+        if concurrency < 1:
+            raise ValueError('concurrency should be at least 1.')
+
+        self.client_args = tuple(client_args)
+        self.client_kwargs = dict(client_kwargs or {})
+        self.processes = processes or os.cpu_count() or 1
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.per_hour = per_hour
+        self.per_day = per_day
+        self.process_post = process_post
+        self.crawl_options = dict(crawl_options or {})
+
+    def _worker_client_kwargs(self) -> Dict[str, Any]:
+        kwargs = dict(self.client_kwargs)
+        if self.per_hour is not None or self.per_day is not None:
+            kwargs.setdefault('rate_limiter', RateLimiter(
+                consumer_per_hour=self.per_hour and max(1, self.per_hour // self.processes),
+                consumer_per_day=self.per_day and max(1, self.per_day // self.processes),
+            ))
+        return kwargs
+
+    def run(self, blog_identifiers: Iterable[str]) -> Iterator[CrawlRecord]:
+        """
+        Crawl all posts of `blog_identifiers`, which are consumed lazily, yielding records as they come in.
+
+        Stopping the iteration early terminates the workers.
+        """
+        context = multiprocessing.get_context()
+        tasks = context.Queue(maxsize=self.processes * self.concurrency * 2)
+        results = context.Queue(maxsize=self.queue_size)
+        aborted = threading.Event()
+        client_kwargs = self._worker_client_kwargs()
+
+        workers = [
+            context.Process(target=_worker, name=f'aiotumblr-crawler-{i}', daemon=True,
+                            args=(self.client_args, client_kwargs, tasks, results, self.concurrency,
+                                  self.process_post, self.crawl_options))
+            for i in range(self.processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        def put_task(blog_identifier: Optional[str]) -> bool:
+            while not aborted.is_set():
+                try:
+                    tasks.put(blog_identifier, timeout=_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def feed():
+            try:
+                for blog_identifier in blog_identifiers:
+                    if not put_task(blog_identifier):
+                        return
+            except Exception:
+                log.exception('Reading blog identifiers failed')
+            for _ in workers:
+                put_task(None)
+
+        feeder = threading.Thread(target=feed, name='aiotumblr-crawler-feeder', daemon=True)
+        feeder.start()
+
+        running = len(workers)
+        try:
+            while running:
+                try:
+                    kind, blog_identifier, payload = results.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        # Died without saying goodbye, e.g. killed
+                        break
+                    continue
+
+                if kind == _EXIT:
+                    running -= 1
+                elif kind == _ITEM:
+                    yield CrawlRecord(blog_identifier, item=payload)
+                else:
+                    yield CrawlRecord(blog_identifier, error=payload)
+        finally:
+            aborted.set()
+            for worker in workers:
+                if running:
+                    worker.terminate()
+                worker.join()
+            feeder.join()
+            # Nothing is going to read what's left in the queues; don't wait for it to be flushed at exit
+            tasks.cancel_join_thread()
+            results.cancel_join_thread()
@@ -0,0 +1,46 @@
+# encoding=utf-8
+import json
+from typing import Any, Dict, Optional
+
+from aiotumblr.utils.cache import CacheEntry, CachedResponse
+
+__all__ = ['DEFAULT_PAYLOAD', 'FakeSession']
+
+DEFAULT_PAYLOAD = {
+    'meta': {'status': 200, 'msg': 'OK'},
+    'response': {
+        'blog': {
+            'name': 'staff',
+            'title': 'Tumblr Staff',
+            'posts': 7432,
+            'updated': 1569871392,
+            'description': 'Official news and updates from the Tumblr team.',
+            'ask': True,
+            'ask_anon': False,
+            'likes': 0,
+        },
+    },
+}
+
+
+class FakeSession(object):
+    """
+    In-process stand-in for `aiohttp.ClientSession`, answering every request with the same canned response.
+
+    Pass it to `TumblrClient(session=...)` to measure the client without any networking involved.
+
+    :param payload: JSON document returned for every request
+    :param status: HTTP status of every response
+    """
+    def __init__(self, payload: Optional[Dict[str, Any]] = None, status: int = 200):
+        body = json.dumps(DEFAULT_PAYLOAD if payload is None else payload).encode('utf-8')
+        self._entry = CacheEntry(status, 'OK', {'Content-Type': 'application/json; charset=utf-8'}, body, 0.0)
+        self.closed = False
+        self.requests = 0
+
+    async def request(self, method: str, url: str, **kwargs) -> CachedResponse:
+        self.requests += 1
+        return CachedResponse(self._entry, method=method, url=url)
+
+    async def close(self):
+        self.closed = True
@@ -0,0 +1,111 @@
+# encoding=utf-8
+"""
+Import-time budget for `aiotumblr`: times a few typical imports, each in fresh interpreters, and fails when one takes
+longer than its budget or loads a module it is meant to leave alone until used.
+
+Usage: `python benchmarks/import_budget.py [--runs N] [--scale FACTOR] [--only NAME ...] [--output FILE]`
+
+The budgets are in milliseconds, for the median of the runs, and are meant for an ordinary development machine;
+`--scale` multiplies them for slower machines such as CI runners. The modules checked for are independent of the
+machine, so those checks catch most regressions even with a generous scale. Results are written as JSON, to stdout
+unless `--output` is given, and the exit status is 1 if any scenario is over budget.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+__all__ = ['SCENARIOS', 'check_budgets']
+
+# name: (statement, budget in milliseconds, modules that must not be loaded by the statement)
+SCENARIOS = {
+    'package': ('import aiotumblr', 25, ('aiohttp', 'oauthlib', 'forge', 'aiotumblr.core')),
+    'signing': ('from aiotumblr.utils.signing import FastSigner', 120, ('aiohttp', 'forge', 'aiotumblr.core')),
+    'client': ('from aiotumblr import TumblrClient', 400, ('forge', 'aiotumblr.utils.tracers')),
+}
+
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'loaded': [name for name in {modules!r} if name in sys.modules]}}))
+"""
+
+
+def time_import(statement: str, modules: Sequence[str]) -> Dict[str, Any]:
+    code = _CHILD.format(statement=statement, modules=tuple(modules))
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    return json.loads(output)
+
+
+def check_budgets(runs: int = 10, scale: float = 1.0, only: Sequence[str] = None) -> Dict[str, Any]:
+    """
+    Run the scenarios and compare them with their budgets.
+
+    :param runs: Fresh interpreters to time every scenario in
+    :param scale: Factor to multiply the budgets with
+    :param only: Names of the scenarios to run, all of them if None
+    :return: Results per scenario, with `ok` False for those over budget or loading modules they shouldn't
+    """
+    results = {}
+    for name in (only or SCENARIOS):
+        statement, budget, modules = SCENARIOS[name]
+        timings = []
+        loaded = set()  # type: set
+        for _ in range(runs):
+            result = time_import(statement, modules)
+            timings.append(result['seconds'] * 1000)
+            loaded.update(result['loaded'])
+        median = statistics.median(timings)
+        results[name] = {
+            'statement': statement,
+            'unit': 'milliseconds',
+            'runs': runs,
+            'min': min(timings),
+            'median': median,
+            'budget': budget * scale,
+            'unexpected_modules': sorted(loaded),
+            'ok': median <= budget * scale and not loaded,
+        }
+    return results
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Check the import time of aiotumblr against its budget.')
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters to time every scenario in')
+    parser.add_argument('--scale', type=float, default=1.0, help='factor to multiply the budgets with')
+    parser.add_argument('--only', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS),
+                        metavar='NAME', help=f'scenarios to run: {", ".join(SCENARIOS)}')
+    parser.add_argument('--output', help='file to write the JSON results to instead of stdout')
+    args = parser.parse_args(argv)
+
+    results = check_budgets(args.runs, args.scale, args.only)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scenarios': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    failed = [name for name, result in results.items() if not result['ok']]
+    for name in failed:
+        result = results[name]
+        print(f'{name}: {result["median"]:.1f} ms (budget {result["budget"]:.1f} ms), '
+              f'unexpected modules: {", ".join(result["unexpected_modules"]) or "none"}', file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# encoding=utf-8
+"""
+End-to-end load test of `TumblrClient` against a local `FakeTumblrServer`.
+
+Usage: `python benchmarks/load.py [--requests N] [--concurrency N] [--latency SECONDS] [--error-rate P] [--output FILE]`
+
+Reports throughput, latency percentiles, errors and the number of connections the server saw, as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from aiotumblr import TumblrClient  # noqa: E402
+from aiotumblr.utils.fakeserver import FakeTumblrServer, lognormal_latency  # noqa: E402
+
+__all__ = ['run_load']
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_load(requests: int = 2000, concurrency: int = 64, latency: float = 0.02, error_rate: float = 0.0,
+                   connection_limit: int = 100, fast_signing: bool = True) -> Dict[str, Any]:
+    consumers, tokens = {'consumer-key': 'consumer-secret'}, {'token': 'token-secret'}
+    server = FakeTumblrServer(consumers=consumers, tokens=tokens, errors={503: error_rate} if error_rate else None,
+                              latency=lognormal_latency(latency) if latency else None, per_hour=None, per_day=None)
+    async with server:
+        client = TumblrClient('consumer-key', 'consumer-secret', 'token', 'token-secret', parse_responses=True,
+                              fast_signing=fast_signing, connection_limit=connection_limit)
+        client.api_base_url = server.url
+        latencies = []  # type: List[float]
+        errors = Counter()  # type: Counter
+        pending = iter(range(requests))
+
+        async def worker():
+            for i in pending:
+                started = time.perf_counter()
+                try:
+                    await client.get_blog_posts(f'blog-{i % 100}', offset=i % 200)
+                except Exception as e:
+                    errors[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            await client.close_connection()
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'server_latency_median': latency,
+        'elapsed': elapsed,
+        'requests_per_second': requests / elapsed,
+        'latency': {
+            'p50': percentile(latencies, 0.5),
+            'p90': percentile(latencies, 0.9),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1] if latencies else 0.0,
+        },
+        'errors': dict(errors),
+        'statuses': {str(status): count for status, count in server.statuses.items()},
+        'connections': server.connections,
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Load test TumblrClient against a local fake Tumblr.')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--latency', type=float, default=0.02, help='median server latency in seconds, 0 for none')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with a 503')
+    parser.add_argument('--connection-limit', type=int, default=100)
+    parser.add_argument('--output', help='file to write the JSON results to instead of stdout')
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_load(args.requests, args.concurrency, args.latency, args.error_rate,
+                                   args.connection_limit))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
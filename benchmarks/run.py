@@ -0,0 +1,190 @@
+# encoding=utf-8
+"""
+Microbenchmarks for the overhead of `aiotumblr`, using an in-process fake transport instead of the network.
+
+Usage: `python benchmarks/run.py [--quick] [--only NAME ...] [--output FILE]`
+
+Results are written as JSON, to stdout unless `--output` is given. Every benchmark reports the seconds per operation
+over a number of repeated runs (`min`, `median`, `mean`, `stdev`) and the operations per second derived from the
+median.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_transport import FakeSession  # noqa: E402
+
+__all__ = ['BENCHMARKS', 'run_benchmarks']
+
+BLOG = 'staff.tumblr.com'
+API_BASE_URL = 'https://api.tumblr.com/v2/'
+
+
+def summarize(timings: List[float], number: int) -> Dict[str, Any]:
+    per_op = [timing / number for timing in timings]
+    median = statistics.median(per_op)
+    return {
+        'unit': 'seconds',
+        'runs': len(per_op),
+        'ops_per_run': number,
+        'min': min(per_op),
+        'median': median,
+        'mean': statistics.mean(per_op),
+        'stdev': statistics.stdev(per_op) if len(per_op) > 1 else 0.0,
+        'ops_per_second': 1 / median if median else None,
+    }
+
+
+def measure(func: Callable[[], Any], number: int, repeat: int) -> Dict[str, Any]:
+    func()  # Warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append(time.perf_counter() - started)
+    return summarize(timings, number)
+
+
+async def measure_async(func: Callable[[], Awaitable[Any]], number: int, repeat: int) -> Dict[str, Any]:
+    await func()  # Warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            await func()
+        timings.append(time.perf_counter() - started)
+    return summarize(timings, number)
+
+
+def bench_import(quick: bool) -> Dict[str, Any]:
+    """Import of the client in a fresh interpreter, including registering the public API."""
+    code = ('import time; started = time.perf_counter(); from aiotumblr import TumblrClient; '
+            'print(time.perf_counter() - started)')
+    timings = []
+    for _ in range(5 if quick else 20):
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout
+        timings.append(float(output))
+    return summarize(timings, 1)
+
+
+def bench_register(quick: bool) -> Dict[str, Any]:
+    """`PublicAPI.register` on `TumblrClient`, i.e. generating all public endpoint methods."""
+    from aiotumblr import TumblrClient
+    from aiotumblr.extensions import PublicAPI
+
+    timings = []
+    for _ in range(5 if quick else 30):
+        TumblrClient.unregister_extension(PublicAPI)
+        started = time.perf_counter()
+        TumblrClient.register_extension(PublicAPI)
+        timings.append(time.perf_counter() - started)
+    return summarize(timings, 1)
+
+
+def _client(fast_signing: bool):
+    from aiotumblr import TumblrClient
+
+    return TumblrClient('consumer-key', 'consumer-secret', 'resource-owner-key', 'resource-owner-secret',
+                        fast_signing=fast_signing, session=FakeSession())
+
+
+def _bench_calls(fast_signing: bool, quick: bool) -> Dict[str, Any]:
+    client = _client(fast_signing)
+    number, repeat = (200, 5) if quick else (1000, 10)
+
+    async def generated():
+        await client.get_blog_posts(BLOG, limit=20, offset=40)
+
+    async def direct():
+        await client.signed_request('GET', f'blog/{BLOG}/posts', params=[('limit', '20'), ('offset', '40')])
+
+    async def run():
+        return {
+            'generated_method': await measure_async(generated, number, repeat),
+            'signed_request': await measure_async(direct, number, repeat),
+        }
+
+    results = asyncio.run(run())
+    results['overhead_per_call'] = results['generated_method']['median'] - results['signed_request']['median']
+    return results
+
+
+def bench_calls(quick: bool) -> Dict[str, Any]:
+    """A generated method (`get_blog_posts`) against the equivalent `signed_request` call, signed with oauthlib."""
+    return _bench_calls(False, quick)
+
+
+def bench_calls_fast_signing(quick: bool) -> Dict[str, Any]:
+    """As `calls`, with `fast_signing=True`."""
+    return _bench_calls(True, quick)
+
+
+def bench_signing(quick: bool) -> Dict[str, Any]:
+    """Signing a GET request with query parameters, by oauthlib and by `FastSigner`."""
+    from oauthlib.common import add_params_to_uri
+    from oauthlib.oauth1 import Client
+    from aiotumblr.utils.signing import FastSigner
+
+    oauth_client = Client('consumer-key', 'consumer-secret', 'resource-owner-key', 'resource-owner-secret')
+    signer = FastSigner(oauth_client)
+    endpoint = f'blog/{BLOG}/posts'
+    params = [('limit', '20'), ('offset', '40'), ('reblog_info', 'true')]
+    number, repeat = (500, 5) if quick else (2000, 10)
+
+    return {
+        'oauthlib': measure(lambda: oauth_client.sign(add_params_to_uri(API_BASE_URL + endpoint, params),
+                                                      http_method='GET'), number, repeat),
+        'fast_signer': measure(lambda: signer.sign('GET', API_BASE_URL, endpoint, params=params), number, repeat),
+    }
+
+
+BENCHMARKS = {
+    'import': bench_import,
+    'register': bench_register,
+    'calls': bench_calls,
+    'calls_fast_signing': bench_calls_fast_signing,
+    'signing': bench_signing,
+}  # type: Dict[str, Callable[[bool], Dict[str, Any]]]
+
+
+def run_benchmarks(names: List[str], quick: bool = False) -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'quick': quick,
+        'benchmarks': {name: BENCHMARKS[name](quick) for name in names},
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Run the aiotumblr microbenchmarks.')
+    parser.add_argument('--quick', action='store_true', help='fewer runs, for a rough impression')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), default=list(BENCHMARKS),
+                        metavar='NAME', help=f'benchmarks to run: {", ".join(BENCHMARKS)}')
+    parser.add_argument('--output', help='file to write the JSON results to instead of stdout')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.only, quick=args.quick)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -27,5 +27,8 @@ setup(
     ],
     packages=['aiotumblr'],
     install_requires=['aiohttp', 'oauthlib', 'python-forge'],
+    extras_require={
+        'speedups': ['orjson'],
+    },
     cmdclass=cmdclass
 )
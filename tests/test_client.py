@@ -0,0 +1,108 @@
+# encoding=utf-8
+import asyncio
+import gc
+import threading
+import warnings
+
+import pytest
+
+from aiotumblr.core import TumblrClient
+from aiotumblr.extensions import Extension, PublicAPI
+from aiotumblr.extensions import utils as extension_utils
+from aiotumblr.extensions.public import _ENDPOINTS
+from aiotumblr.extensions.utils import iterator_name, register_endpoint, unregister_endpoint
+from aiotumblr.utils.fakeserver import FakeTumblrServer
+from aiotumblr.utils.phases import PhaseTimer
+
+
+@pytest.fixture
+def server_url():
+    # Served from a loop of its own, so clients can be used from any number of other loops
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = FakeTumblrServer()
+    yield asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_client_survives_event_loop_changes(server_url):
+    client = TumblrClient('consumer', 'secret', parse_responses=True)
+    client.api_base_url = server_url
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        sessions = []
+        for _ in range(3):
+            assert asyncio.run(client.get_blog_info('staff'))['blog']['name']
+            sessions.append(client._session)
+        asyncio.run(client.close_connection())
+        gc.collect()
+
+    assert all(session.closed for session in sessions)
+    assert not [warning for warning in caught if issubclass(warning.category, ResourceWarning)]
+
+
+def test_registering_on_a_subclass_leaves_the_base_client_alone():
+    method_info = dict(next(info for info in _ENDPOINTS if info['method_name'] == 'get_blog_info'),
+                       method_name='get_blog_info_again')
+
+    class Again(Extension):
+        @classmethod
+        def register(cls, client):
+            register_endpoint(client, method_info)
+
+        @classmethod
+        def unregister(cls, client):
+            unregister_endpoint(client, method_info)
+
+    class SubClient(TumblrClient):
+        pass
+
+    base_timed = dict(TumblrClient._timed_methods)
+    SubClient.register_extension(Again)
+    try:
+        base = TumblrClient('consumer', 'secret', phase_timer=PhaseTimer())
+        sub = SubClient('consumer', 'secret', phase_timer=PhaseTimer())
+
+        assert TumblrClient._timed_methods == base_timed
+        assert not hasattr(base, 'get_blog_info_again')
+        assert 'get_blog_info_again' in sub.__dict__
+        # Timed variants of the base class still apply to the subclass
+        assert 'get_blog_info' in sub.__dict__ and 'get_blog_info' in base.__dict__
+    finally:
+        SubClient.unregister_extension(Again)
+
+    assert TumblrClient._timed_methods == base_timed
+    assert not hasattr(SubClient('consumer', 'secret'), 'get_blog_info_again')
+
+
+def test_registering_builds_nothing_until_accessed(monkeypatch):
+    specs = []
+
+    class RecordingSpec(extension_utils.EndpointSpec):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            specs.append(self.method_name)
+
+    monkeypatch.setattr(extension_utils, 'EndpointSpec', RecordingSpec)
+
+    class SubClient(TumblrClient):
+        pass
+
+    SubClient.register_extension(PublicAPI)
+    names = [info['method_name'] for info in _ENDPOINTS]
+    names += [iterator_name(info) for info in _ENDPOINTS if 'pagination' in info]
+    assert not specs
+    assert all(isinstance(vars(SubClient)[name], extension_utils._LazyMethod) for name in names)
+    assert all(vars(SubClient)[name].method is None for name in names)
+    assert all(timed.method is None for timed in vars(SubClient)['_timed_methods'].values())
+
+    method = SubClient.get_blog_info
+    assert specs == ['get_blog_info']
+    assert vars(SubClient)['get_blog_info'] is method
+    assert 'blog_identifier' in method.__doc__
+    assert isinstance(vars(SubClient)['get_blog_posts'], extension_utils._LazyMethod)
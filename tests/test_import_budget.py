@@ -0,0 +1,25 @@
+# encoding=utf-8
+import pytest
+
+from benchmarks.import_budget import SCENARIOS, check_budgets
+
+# Timings of a test run vary with the machine and whatever else it's doing, so only gross regressions fail here;
+# the modules loaded by every import don't vary, and are checked exactly
+SCALE = 4.0
+
+
+@pytest.fixture(scope='module')
+def results():
+    # Every import is timed in fresh interpreters
+    return check_budgets(runs=3, scale=SCALE)
+
+
+@pytest.mark.parametrize('scenario', sorted(SCENARIOS))
+def test_import_loads_no_unexpected_modules(results, scenario):
+    assert results[scenario]['unexpected_modules'] == []
+
+
+@pytest.mark.parametrize('scenario', sorted(SCENARIOS))
+def test_import_time_within_budget(results, scenario):
+    result = results[scenario]
+    assert result['median'] <= result['budget'], f'{result["statement"]} took {result["median"]:.1f} ms'
@@ -0,0 +1,62 @@
+# encoding=utf-8
+import asyncio
+
+from aiotumblr.core import TumblrClient
+from aiotumblr.utils.fakeserver import FakeTumblrServer
+
+# Seven posts every second, newest first, so posts share a timestamp across the offset limit of 1000
+POSTS = [{'id': 5000 - index, 'timestamp': 1600000000 - index // 7} for index in range(1200)]
+assert POSTS[999]['timestamp'] == POSTS[1000]['timestamp']
+
+
+def posts_payload(requests):
+    def payload(url_params, params, body):
+        requests.append(dict(params))
+        limit = int(params.get('limit', 20))
+        if 'before' in params:
+            posts = [post for post in POSTS if post['timestamp'] < int(params['before'])]
+        else:
+            posts = POSTS[int(params.get('offset', 0)):]
+        return {'posts': posts[:limit], 'total_posts': len(POSTS)}
+    return payload
+
+
+async def iterate(take=None, **kwargs):
+    requests = []
+    async with FakeTumblrServer(payloads={'get_blog_posts': posts_payload(requests)}, per_hour=None,
+                                per_day=None) as server:
+        client = TumblrClient('consumer', 'secret', parse_responses=True)
+        client.api_base_url = server.url
+        ids = []
+        async for post in client.iter_blog_posts('staff', **kwargs):
+            ids.append(post['id'])
+            if take is not None and len(ids) == take:
+                break
+        await asyncio.sleep(0.05)
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        await client.close_connection()
+    return ids, requests, pending
+
+
+def test_offset_to_cursor_switch_yields_every_post_once():
+    ids, requests, _ = asyncio.run(iterate(limit=20))
+
+    assert ids == [post['id'] for post in POSTS]
+    assert any('before' in params for params in requests)
+    assert max(int(params.get('offset', 0)) for params in requests) < 1000
+
+
+def test_cursor_paging_with_ties_yields_every_post_once():
+    ids, requests, _ = asyncio.run(iterate(limit=20, before=POSTS[0]['timestamp'] + 1))
+
+    assert ids == [post['id'] for post in POSTS]
+    assert all('offset' not in params for params in requests)
+
+
+def test_breaking_out_cancels_prefetching():
+    ids, requests, pending = asyncio.run(iterate(take=5, limit=20, prefetch=2))
+
+    assert ids == [post['id'] for post in POSTS[:5]]
+    assert not pending
+    # The page being read and the prefetched pages, nothing after the consumer went away
+    assert len(requests) <= 4
@@ -0,0 +1,63 @@
+# encoding=utf-8
+import asyncio
+from collections import Counter
+
+from aiotumblr.utils.scheduling import PRIORITY_HIGH, PRIORITY_LOW, RequestScheduler
+
+
+async def saturate(scheduler, workers, duration):
+    completed = Counter()
+    in_flight = Counter()
+    peak = Counter()
+    stop = asyncio.get_running_loop().time() + duration
+
+    async def worker(priority):
+        while asyncio.get_running_loop().time() < stop:
+            async with scheduler.slot(priority):
+                in_flight[priority] += 1
+                peak[priority] = max(peak[priority], in_flight[priority])
+                await asyncio.sleep(0.001)
+                in_flight[priority] -= 1
+            completed[priority] += 1
+
+    await asyncio.gather(*(worker(priority) for priority, count in workers.items() for _ in range(count)))
+    return completed, peak
+
+
+def test_low_priority_keeps_completing_while_high_saturates():
+    scheduler = RequestScheduler(8)
+    completed, peak = asyncio.run(saturate(scheduler, {PRIORITY_HIGH: 50, PRIORITY_LOW: 50}, 0.5))
+
+    assert completed[PRIORITY_LOW] > 0
+    # Stride scheduling gives low about 1/17 of the slots with the default weights
+    assert completed[PRIORITY_LOW] / (completed[PRIORITY_HIGH] + completed[PRIORITY_LOW]) > 0.02
+    assert completed[PRIORITY_HIGH] > completed[PRIORITY_LOW]
+    assert scheduler.active == 0
+
+
+def test_reserved_slots_stay_free_of_low_priority():
+    scheduler = RequestScheduler(8)
+    completed, peak = asyncio.run(saturate(scheduler, {PRIORITY_LOW: 50}, 0.2))
+
+    assert completed[PRIORITY_LOW] > 0
+    assert peak[PRIORITY_LOW] == 8 - scheduler.reserved
+
+
+def test_high_priority_starts_right_away_during_crawl():
+    async def run():
+        scheduler = RequestScheduler(8)
+        release = asyncio.Event()
+
+        async def crawl():
+            async with scheduler.slot(PRIORITY_LOW):
+                await release.wait()
+
+        crawlers = [asyncio.ensure_future(crawl()) for _ in range(20)]
+        await asyncio.sleep(0)
+        await asyncio.wait_for(scheduler.acquire(PRIORITY_HIGH), 0.1)
+        scheduler.release(PRIORITY_HIGH)
+        release.set()
+        await asyncio.gather(*crawlers)
+        return scheduler
+
+    assert asyncio.run(run()).active == 0
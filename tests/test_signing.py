@@ -0,0 +1,109 @@
+# encoding=utf-8
+import random
+
+import pytest
+from oauthlib.common import add_params_to_uri
+from oauthlib.oauth1 import Client
+
+from aiotumblr.core import TumblrClient
+from aiotumblr.utils.signing import FastSigner
+
+BASE_URL = TumblrClient.api_base_url
+FORM = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+CREDENTIALS = [
+    {'client_key': 'consumer', 'client_secret': 'consumer secret'},
+    {'client_key': 'consumer', 'client_secret': 'consumer secret', 'resource_owner_key': 'token',
+     'resource_owner_secret': 'token secret'},
+    {'client_key': 'c&k=1', 'client_secret': 's+e/c r%t', 'resource_owner_key': 'tök€n',
+     'resource_owner_secret': 'sécret~!*'},
+]
+
+VALUES = ['plain', 'cute cats', 'é', '日本語', '🐈', 'a&b=c', 'a+b', '100%', '~-._', "!*'();:@$,/?#[]", '', 'x' * 300]
+# `?` and `#` would end the path, endpoints never contain them unescaped
+PATH_VALUES = [value for value in VALUES if '?' not in value and '#' not in value] + ["!*'();:@$,[]"]
+
+
+def oauthlib_headers(client, http_method, endpoint, params, body, headers):
+    # Same call as `TumblrClient._sign` makes when fast signing is disabled
+    uri = add_params_to_uri(BASE_URL + endpoint, params or [])
+    _, signed_headers, _ = client.sign(uri, http_method=http_method, body=body, headers=headers)
+    return signed_headers
+
+
+def assert_same_signature(credentials, http_method, endpoint, params=None, body=None, headers=None):
+    client = Client(nonce='1234567890abcdef', timestamp='1577836800', **credentials)
+    expected = oauthlib_headers(client, http_method, endpoint, params, body, headers)
+    actual = FastSigner(client).sign(http_method, BASE_URL, endpoint, params=params, body=body, headers=headers)
+    assert actual == expected
+
+
+@pytest.mark.parametrize('credentials', CREDENTIALS)
+@pytest.mark.parametrize('value', VALUES)
+def test_get_query(credentials, value):
+    assert_same_signature(credentials, 'GET', 'blog/staff.tumblr.com/posts',
+                          params=[('tag', value), ('limit', '20'), ('reblog_info', 'true')])
+
+
+@pytest.mark.parametrize('credentials', CREDENTIALS)
+def test_get_without_params(credentials):
+    assert_same_signature(credentials, 'GET', 'user/info')
+
+
+@pytest.mark.parametrize('credentials', CREDENTIALS)
+@pytest.mark.parametrize('value', VALUES)
+def test_post_form_body(credentials, value):
+    assert_same_signature(credentials, 'POST', 'user/follow', body={'url': value, 'email': 'me@example.com'},
+                          headers=FORM)
+
+
+@pytest.mark.parametrize('credentials', CREDENTIALS)
+@pytest.mark.parametrize('value', VALUES)
+def test_post_json_body(credentials, value):
+    # JSON bodies aren't part of the signature, `TumblrClient._sign` passes no body for them
+    assert_same_signature(credentials, 'POST', 'blog/staff.tumblr.com/posts', params=[('q', value)],
+                          headers={'Content-Type': 'application/json'})
+
+
+@pytest.mark.parametrize('value', PATH_VALUES)
+def test_reserved_characters_in_endpoint(value):
+    assert_same_signature(CREDENTIALS[1], 'GET', f'blog/{value or "x"}.tumblr.com/info')
+
+
+def test_callback_and_verifier():
+    credentials = dict(CREDENTIALS[1], callback_uri='https://example.com/callback?a=1&b=2', verifier='vérifier')
+    assert_same_signature(credentials, 'POST', 'oauth/access_token', body={'x': 'y'}, headers=FORM)
+
+
+def test_randomized():
+    rng = random.Random(519)
+    alphabet = 'abcXYZ019 -._~!*\'()&=+/%?#@:;,[]$éü€日🐈'
+    path_alphabet = alphabet.replace('?', '').replace('#', '')
+
+    def text(characters=alphabet):
+        return ''.join(rng.choice(characters) for _ in range(rng.randint(0, 12)))
+
+    for _ in range(2000):
+        credentials = dict(rng.choice(CREDENTIALS))
+        http_method = rng.choice(['GET', 'POST', 'PUT', 'DELETE'])
+        params = [(text() or 'k', text()) for _ in range(rng.randint(0, 4))] or None
+        body, headers = None, None
+        if http_method != 'GET' and rng.random() < 0.5:
+            body = {text() or 'k': text() for _ in range(rng.randint(1, 4))}
+            headers = FORM
+        endpoint = f'blog/{text(path_alphabet) or "x"}/posts'
+        assert_same_signature(credentials, http_method, endpoint, params, body, headers)
+
+
+def test_secrets_changing_after_creation():
+    client = Client('consumer', client_secret='one', nonce='n', timestamp='1')
+    signer = FastSigner(client)
+    first = signer.sign('GET', BASE_URL, 'user/info')
+    client.resource_owner_key, client.resource_owner_secret = 'token', 'two'
+    assert signer.sign('GET', BASE_URL, 'user/info') == oauthlib_headers(client, 'GET', 'user/info', None, None, None)
+    assert signer.sign('GET', BASE_URL, 'user/info') != first
+
+
+def test_rejects_other_signature_methods():
+    with pytest.raises(ValueError):
+        FastSigner(Client('consumer', signature_method='RSA-SHA1', rsa_key='key'))
@@ -0,0 +1,43 @@
+# encoding=utf-8
+import threading
+
+from aiotumblr.sync import SyncTumblrClient
+from aiotumblr.utils.fakeserver import FakeTumblrServer
+from aiotumblr.utils.scheduling import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, RequestScheduler
+
+
+class RecordingScheduler(RequestScheduler):
+    def __init__(self):
+        super().__init__(4)
+        self.priorities = []
+
+    async def acquire(self, priority=PRIORITY_NORMAL):
+        self.priorities.append(priority)
+        await super().acquire(priority)
+
+
+def test_priority_carries_over_to_the_loop_thread():
+    scheduler = RecordingScheduler()
+    with SyncTumblrClient('consumer', 'secret', scheduler=scheduler) as client:
+        server = FakeTumblrServer()
+        client.client.api_base_url = client.run(server.start())
+
+        client.get_blog_info('staff')
+        with client.priority(PRIORITY_LOW):
+            client.get_blog_info('staff')
+            posts = list(client.iter_blog_posts('staff', limit=20))
+
+        def interactive():
+            with client.priority(PRIORITY_HIGH):
+                client.get_blog_info('staff')
+        thread = threading.Thread(target=interactive)
+        thread.start()
+        thread.join()
+        client.get_blog_info('staff')
+
+        client.run(server.close())
+
+    assert len(posts) == server.posts_per_blog
+    pages = len(scheduler.priorities) - 4
+    assert scheduler.priorities == ([PRIORITY_NORMAL, PRIORITY_LOW] + [PRIORITY_LOW] * pages
+                                    + [PRIORITY_HIGH, PRIORITY_NORMAL])